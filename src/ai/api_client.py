@@ -1,7 +1,137 @@
-from openai import OpenAI
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI
 from src.config import _Config
+from .resilience import CircuitBreaker, RetryPolicy
+
+# Общий пул HTTP-соединений к DeepSeek на весь процесс
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=_Config.DEEPSEEK_MAX_CONNECTIONS,
+        max_keepalive_connections=_Config.DEEPSEEK_MAX_CONNECTIONS
+    ),
+    timeout=httpx.Timeout(
+        _Config.DEEPSEEK_REQUEST_TIMEOUT,
+        connect=_Config.DEEPSEEK_CONNECT_TIMEOUT
+    )
+)
 
-client = OpenAI(
+client = AsyncOpenAI(
     api_key=_Config.DEEPSEEK_API_KEY,
-    base_url="https://api.deepseek.com"
-)
\ No newline at end of file
+    base_url=_Config.DEEPSEEK_BASE_URL,
+    http_client=http_client,
+    max_retries=0  # повторами управляет retry_policy
+)
+
+deepseek_breaker = CircuitBreaker(
+    failure_threshold=_Config.DEEPSEEK_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_timeout=_Config.DEEPSEEK_CIRCUIT_RECOVERY_TIMEOUT
+)
+
+
+
+@dataclass
+class PromptCacheMetrics:
+    """Сколько токенов промпта провайдер взял из своего кэша префиксов."""
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def record(self, usage: Optional[Dict[str, int]]) -> None:
+        if usage:
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.cached_tokens += usage["cached_tokens"]
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "prompt_cached_tokens": self.cached_tokens,
+            "prompt_cache_hit_rate": round(self.hit_rate, 3)
+        }
+
+
+prompt_cache_metrics = PromptCacheMetrics()
+
+retry_policy = RetryPolicy(
+    deepseek_breaker,
+    max_attempts=_Config.DEEPSEEK_MAX_ATTEMPTS,
+    base_delay=_Config.DEEPSEEK_RETRY_BASE_DELAY,
+    max_delay=_Config.DEEPSEEK_RETRY_MAX_DELAY
+)
+
+
+async def create_chat_completion(timeout: Optional[float] = None, **kwargs):
+    """
+    Args:
+        timeout: Таймаут запроса в секундах (по умолчанию DEEPSEEK_REQUEST_TIMEOUT)
+        **kwargs: Параметры chat.completions.create
+
+    Returns:
+        Ответ API
+    """
+    return await retry_policy.call(
+        client.chat.completions.create,
+        timeout=timeout or _Config.DEEPSEEK_REQUEST_TIMEOUT,
+        **kwargs
+    )
+
+
+async def stream_chat_completion(timeout: Optional[float] = None, **kwargs) -> AsyncIterator:
+    """
+    Потоковый запрос: соединение занято, пока поток не будет дочитан.
+
+    Args:
+        timeout: Таймаут запроса в секундах (по умолчанию DEEPSEEK_REQUEST_TIMEOUT)
+        **kwargs: Параметры chat.completions.create
+
+    Yields:
+        Чанки ответа API
+    """
+    async for chunk in retry_policy.stream(_open_stream, timeout, **kwargs):
+        yield chunk
+
+
+async def _open_stream(timeout: Optional[float] = None, **kwargs) -> AsyncIterator:
+    stream = await client.chat.completions.create(
+        timeout=timeout or _Config.DEEPSEEK_REQUEST_TIMEOUT,
+        stream=True,
+        **kwargs
+    )
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        await stream.close()
+
+
+def extract_usage(usage) -> Optional[Dict[str, int]]:
+    """
+    Приводит usage из ответа API к словарю.
+
+    Returns:
+        prompt_tokens, completion_tokens, total_tokens, cached_tokens или None
+    """
+    if usage is None:
+        return None
+
+    # DeepSeek отдаёт prompt_cache_hit_tokens, OpenAI-совместимые — prompt_tokens_details
+    cached_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached_tokens is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) if details else None
+
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_tokens": cached_tokens or 0
+    }
+
+
+async def close_client() -> None:
+    await client.close()
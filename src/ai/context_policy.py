@@ -0,0 +1,112 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import _Config
+from src.database.CRUDs.subscription import SubscriptionType
+from .tokenizer import MESSAGE_TOKEN_OVERHEAD
+
+FREE_TIER = "free"
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    history_tokens: int  # бюджет истории в промпте
+    history_messages: int  # сколько последних сообщений рассматривать
+    fetch_messages: int  # сколько сообщений читать из БД
+    max_completion_tokens: int
+    block_messages: int = 8  # шаг сдвига окна истории
+
+
+class ContextPolicy(ABC):
+    """Выбор бюджета контекста для пользователя и подгонка истории под него."""
+
+    @abstractmethod
+    def budget_for(self, subscription_type: Optional[str]) -> ContextBudget:
+        pass
+
+    def fit(self, history: List[Dict], budget: ContextBudget, summary_seq: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Окно истории в пределах budget.history_tokens, начинающееся на границе блока.
+
+        Начало окна сдвигается только целыми блоками, поэтому между ходами
+        промпт лишь дописывается в конец и его префикс попадает в кэш
+        провайдера. Блок не длиннее половины самого длинного помещающегося
+        хвоста, поэтому окно никогда не сжимается меньше чем до этой
+        половины. Последнее сообщение входит всегда.
+
+        Returns:
+            Сообщения окна и их размер в токенах
+        """
+        history = history[-budget.history_messages:]
+        if not history:
+            return [], 0
+
+        # token_count хранится для каждого сообщения (NOT NULL), токенизация не нужна
+        sizes = np.fromiter(
+            (msg["token_count"] for msg in history),
+            dtype=np.int64,
+            count=len(history)
+        ) + MESSAGE_TOKEN_OVERHEAD
+        # suffix[i] — размер окна, начинающегося с i-го сообщения
+        suffix = np.cumsum(sizes[::-1])[::-1]
+
+        # Блоки отсчитываются от начала несжатой части диалога; без seq граница любая
+        seqs = np.fromiter(
+            (msg["seq"] if msg.get("seq") is not None else -1 for msg in history),
+            dtype=np.int64,
+            count=len(history)
+        )
+        fits = suffix <= budget.history_tokens
+        fitting = np.flatnonzero(fits)
+        if not fitting.size:
+            start = len(history) - 1
+            return history[start:], int(suffix[start])
+
+        longest = len(history) - int(fitting[0])
+        block = max(min(budget.block_messages, longest // 2 + 1), 1)
+        aligned = (seqs < 0) | ((seqs - summary_seq - 1) % block == 0)
+
+        candidates = np.flatnonzero(aligned & fits)
+        start = int(candidates[0]) if candidates.size else int(fitting[0])
+        return history[start:], int(suffix[start])
+
+
+class TieredContextPolicy(ContextPolicy):
+    """Бюджеты по уровню подписки; всё, кроме явно заданных уровней, — free."""
+
+    def __init__(self, budgets: Dict[str, ContextBudget]):
+        self._budgets = budgets
+
+    def budget_for(self, subscription_type: Optional[str]) -> ContextBudget:
+        return self._budgets.get(subscription_type or FREE_TIER, self._budgets[FREE_TIER])
+
+
+_context_policy: ContextPolicy = TieredContextPolicy({
+    FREE_TIER: ContextBudget(
+        history_tokens=_Config.CONTEXT_FREE_HISTORY_TOKENS,
+        history_messages=_Config.CONTEXT_FREE_HISTORY_MESSAGES,
+        fetch_messages=_Config.CONTEXT_FREE_FETCH_MESSAGES,
+        max_completion_tokens=_Config.CONTEXT_FREE_MAX_COMPLETION_TOKENS,
+        block_messages=_Config.CONTEXT_BLOCK_MESSAGES
+    ),
+    SubscriptionType.PREMIUM.value: ContextBudget(
+        history_tokens=_Config.CONTEXT_PREMIUM_HISTORY_TOKENS,
+        history_messages=_Config.CONTEXT_PREMIUM_HISTORY_MESSAGES,
+        fetch_messages=_Config.CONTEXT_PREMIUM_FETCH_MESSAGES,
+        max_completion_tokens=_Config.CONTEXT_PREMIUM_MAX_COMPLETION_TOKENS,
+        block_messages=_Config.CONTEXT_BLOCK_MESSAGES
+    )
+})
+
+
+def get_context_policy() -> ContextPolicy:
+    return _context_policy
+
+
+def set_context_policy(policy: ContextPolicy) -> None:
+    """Подменяет политику контекста (например, для эксперимента с бюджетами)."""
+    global _context_policy
+    _context_policy = policy
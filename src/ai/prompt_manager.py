@@ -1,95 +1,359 @@
-import tiktoken
-from .api_client import client
+from dataclasses import dataclass
+from functools import lru_cache
+import logging
+from typing import AsyncIterator, List, Dict, Optional, Union
+from .api_client import create_chat_completion, stream_chat_completion, extract_usage, prompt_cache_metrics
+from .context_policy import get_context_policy
+from .resilience import CircuitOpenError
+from .response_cache import CachedResponse, get_response_cache, make_cache_key
+from .scheduler import llm_scheduler
+from .semantic_cache import semantic_cache
+from .tokenizer import count_tokens, count_tokens_async, MESSAGE_TOKEN_OVERHEAD
+from src.database.CRUDs.subscription import SubscriptionType
+from src.database.CRUDs.turn import AsyncTurnService, TurnContextDTO
 from src.database.CRUDs.user import AsyncUserService
-from src.database.CRUDs.dialogue import AsyncDialogueService
+from src.config import _Config
+from src.utils import payload_log_level
 
-async def standard_request(telegram_id: int, user_message: str):
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "Ты полезный ассистент. Отвечай кратко \
+и по делу. Если нужно дать развернутый ответ, ОБЯЗАТЕЛЬНО укладываться в 3000 символов. \
+Избегай чрезмерно длинных ответов."
+
+# Меньше этого остатка отвечать бессмысленно — считаем лимит исчерпанным
+MIN_COMPLETION_TOKENS = 64
+
+LIMIT_REACHED_TEXT = "Достигнут лимит токенов."
+API_ERROR_TEXT = "Произошла ошибка при обращении к AI. Попробуйте позже."
+API_UNAVAILABLE_TEXT = "AI временно недоступен. Попробуйте через минуту."
+
+
+@dataclass
+class PreparedRequest:
+    turn: TurnContextDTO
+    messages: List[Dict]
+    prompt_tokens: int  # локальная оценка, нужна только если API не вернул usage
+    max_tokens: int
+    premium: bool = False
+    cache_key: Optional[str] = None
+    semantic_prompt: Optional[str] = None
+
+
+@lru_cache(maxsize=None)
+def _system_prompt_tokens() -> int:
+    return count_tokens(SYSTEM_PROMPT) + MESSAGE_TOKEN_OVERHEAD
+
+
+async def _prepare_messages(telegram_id: int, user_message: str) -> Union[PreparedRequest, str]:
     """
-    Args:
-        telegram_id: ID пользователя в Telegram
-        user_message: Сообщение пользователя
+    Резервирует токены, сохраняет сообщение пользователя и собирает контекст для API.
 
     Returns:
-        Ответ ассистента
+        Подготовленный запрос или текст ошибки
     """
+    # Быстрая проверка по кэшу квот: исчерпанный лимит не трогает БД
+    quota = await AsyncUserService.get_quota_state(telegram_id)
+    if quota is None:
+        return "Пользователь не найден. Пожалуйста, сначала выполните команду /start"
+
+    policy = get_context_policy()
+    budget = policy.budget_for(quota.subscription_type)
+
+    # Резерв: системный промпт, резюме, максимум истории и max_tokens, но не больше остатка лимита
+    reserve_tokens = min(
+        _system_prompt_tokens() + _Config.SUMMARY_MAX_TOKENS + budget.history_tokens + budget.max_completion_tokens,
+        quota.remaining
+    )
+    if reserve_tokens < MIN_COMPLETION_TOKENS:
+        return LIMIT_REACHED_TEXT
+
     try:
-        dialogue_user = await AsyncDialogueService.add_message(
+        turn = await AsyncTurnService.begin_turn(
             telegram_id=telegram_id,
-            role="user",
-            content=user_message
+            content=user_message,
+            reserve_tokens=reserve_tokens,
+            history_limit=budget.fetch_messages
         )
-        print(f"После добавления сообщения пользователя: {dialogue_user}")
-        print(f"История после добавления пользователя: {dialogue_user.conversation_history}")
-
     except ValueError:
         return "Пользователь не найден. Пожалуйста, сначала выполните команду /start"
-    except Exception as e:
-        print(f"Ошибка при добавлении сообщения пользователя: {e}")
+    except Exception:
+        logger.exception("Failed to begin turn for user %s", telegram_id)
         return "Произошла ошибка при сохранении сообщения"
 
-    conversation_history = await AsyncDialogueService.get_conversation_history(telegram_id, limit=20)
-    print(f"Полученная история: {conversation_history}")
+    if not turn.has_reservation:
+        return LIMIT_REACHED_TEXT
+
+    # Кэш квот мог устареть (тариф сменили в другом воркере) — верим тарифу из резерва
+    subscription_type = turn.subscription_type if turn.subscription_checked else quota.subscription_type
+    if subscription_type != quota.subscription_type:
+        budget = policy.budget_for(subscription_type)
+
+    conversation_history = turn.history
 
     messages_for_api = []
-    total_tokens = 0
+    current_tokens = 0
+    trimmed = False
     if conversation_history:
-        try:
-            encoding = tiktoken.encoding_for_model("deepseek-chat")
-        except:
-            encoding = tiktoken.get_encoding("cl100k_base")
-
-        def count_tokens(text):
-            return len(encoding.encode(text))
-
-        max_dialog_tokens = 1024
-        current_tokens = 0
-        recent_history = conversation_history[-15:]
-        for msg in reversed(recent_history):
-            msg_tokens = count_tokens(msg['content']) + 5
-            if current_tokens + msg_tokens <= max_dialog_tokens:
-                current_tokens += msg_tokens
-                messages_for_api.insert(0, {
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+        window, current_tokens = policy.fit(conversation_history, budget, turn.summary_seq)
+        messages_for_api = [{"role": msg["role"], "content": msg["content"]} for msg in window]
+        trimmed = len(window) < len(conversation_history)
     else:
         messages_for_api.append({
             "role": "user",
             "content": user_message
         })
-    messages_for_api.insert(0, {"role": "system", "content": "Ты полезный ассистент. Отвечай кратко \
-и по делу. Если нужно дать развернутый ответ, ОБЯЗАТЕЛЬНО укладываться в 3000 символов. \
-Избегай чрезмерно длинных ответов."})
+    # Сообщения старше хвоста истории модель видит только в виде резюме
+    if turn.summary:
+        messages_for_api.insert(0, {
+            "role": "system",
+            "content": f"Краткое содержание предыдущей части диалога:\n{turn.summary}"
+        })
+        current_tokens += turn.summary_token_count + MESSAGE_TOKEN_OVERHEAD
+    messages_for_api.insert(0, {"role": "system", "content": SYSTEM_PROMPT})
 
-    print(f"Сообщения для API: {messages_for_api}")
+    # Промпт форматируется только при DEBUG или для выборки ходов
+    log_level = payload_log_level(logger)
+    if log_level is not None:
+        logger.log(
+            log_level,
+            "Turn payload for user %s: history=%s messages=%s",
+            telegram_id, len(conversation_history), messages_for_api
+        )
 
-    if not messages_for_api:
-        return "Ошибка: пустой диалог"
+    # Ответ модели не может выйти за пределы зарезервированного бюджета
+    prompt_tokens = _system_prompt_tokens() + current_tokens
+    max_tokens = min(budget.max_completion_tokens, turn.reserved_tokens - prompt_tokens)
+    if max_tokens < MIN_COMPLETION_TOKENS:
+        await AsyncTurnService.release_turn(turn)
+        return LIMIT_REACHED_TEXT
 
-    try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=messages_for_api,
-            stream=False,
-            max_tokens=2048
+    # Кэшируем только ходы без истории (или с короткой): ответ зависит лишь от промпта.
+    # Судим по сохранённой истории, а не по окну: обрезанное окно не значит, что диалог пуст
+    cache_key = None
+    semantic_prompt = None
+    if (
+            not turn.summary
+            and not trimmed
+            and len(conversation_history) <= _Config.RESPONSE_CACHE_MAX_MESSAGES
+    ):
+        if get_response_cache():
+            cache_key = make_cache_key(messages_for_api)
+        # Семантический кэш — только для первого сообщения диалога
+        if semantic_cache and len(conversation_history) <= 1 and len(user_message) <= _Config.SEMANTIC_CACHE_MAX_CHARS:
+            semantic_prompt = user_message
+
+    return PreparedRequest(
+        turn=turn,
+        messages=messages_for_api,
+        prompt_tokens=prompt_tokens,
+        max_tokens=max_tokens,
+        premium=subscription_type == SubscriptionType.PREMIUM,
+        cache_key=cache_key,
+        semantic_prompt=semantic_prompt
+    )
+
+
+async def _cached_reply(prepared: PreparedRequest) -> Optional[str]:
+    cached = None
+    cache = get_response_cache()
+    if cache and prepared.cache_key:
+        cached = await cache.get(prepared.cache_key)
+    if cached is None and prepared.semantic_prompt:
+        cached = semantic_cache.get(prepared.semantic_prompt)
+    if cached is None:
+        return None
+
+    # Ответ из кэша не расходует токены провайдера — резерв возвращается целиком
+    await AsyncTurnService.finish_turn(
+        context=prepared.turn,
+        content=cached.content,
+        tokens_used=0,
+        token_count=cached.token_count,
+        metadata={"cached": True}
+    )
+    return cached.content
+
+
+async def _store_reply(
+        prepared: PreparedRequest,
+        assistant_reply: str,
+        usage: Optional[Dict[str, int]],
+        finish_reason: Optional[str]
+) -> None:
+    # Обрезанные по max_tokens ответы в кэш не попадают
+    if not assistant_reply or finish_reason != "stop":
+        return
+    if not prepared.cache_key and not prepared.semantic_prompt:
+        return
+
+    token_count = usage["completion_tokens"] if usage else await count_tokens_async(assistant_reply)
+    response = CachedResponse(assistant_reply, token_count)
+    cache = get_response_cache()
+    if cache and prepared.cache_key:
+        await cache.set(prepared.cache_key, response)
+    if prepared.semantic_prompt:
+        semantic_cache.set(prepared.semantic_prompt, response)
+
+
+async def _save_reply(prepared: PreparedRequest, assistant_reply: str, usage: Optional[Dict[str, int]]) -> None:
+    if usage:
+        # Списываем ровно то, что насчитал провайдер, без повторной токенизации
+        tokens_used = usage["total_tokens"]
+        reply_tokens = usage["completion_tokens"]
+        prompt_cache_metrics.record(usage)
+        logger.debug(
+            "Prompt cache: %s of %s prompt tokens cached",
+            usage["cached_tokens"], usage["prompt_tokens"]
         )
+    else:
+        reply_tokens = await count_tokens_async(assistant_reply)
+        tokens_used = prepared.prompt_tokens + reply_tokens
+
+    await AsyncTurnService.finish_turn(
+        context=prepared.turn,
+        content=assistant_reply,
+        tokens_used=tokens_used,
+        token_count=reply_tokens,
+        metadata={"usage": usage} if usage else None
+    )
+
+
+async def _abandon_turn(prepared: PreparedRequest, parts: List[str], usage: Optional[Dict[str, int]]) -> None:
+    """Ход прерван снаружи (отмена задачи, закрытый генератор): резерв не должен висеть до конца дня."""
+    try:
+        if parts:
+            await _save_reply(prepared, "".join(parts), usage)
+        else:
+            await AsyncTurnService.release_turn(prepared.turn)
+    except Exception:
+        logger.exception("Failed to settle abandoned turn for user %s", prepared.turn.telegram_id)
+
+
+async def standard_request(telegram_id: int, user_message: str):
+    """
+    Args:
+        telegram_id: ID пользователя в Telegram
+        user_message: Сообщение пользователя
+
+    Returns:
+        Ответ ассистента
+    """
+    prepared = await _prepare_messages(telegram_id, user_message)
+    if isinstance(prepared, str):
+        return prepared
 
+    cached_reply = await _cached_reply(prepared)
+    if cached_reply is not None:
+        return cached_reply
+
+    settled = False
+    try:
+        async with llm_scheduler.slot(
+            telegram_id,
+            prepared.prompt_tokens + prepared.max_tokens,
+            premium=prepared.premium
+        ) as slot:
+            response = await create_chat_completion(
+                model="deepseek-chat",
+                messages=prepared.messages,
+                stream=False,
+                max_tokens=prepared.max_tokens
+            )
+            usage = extract_usage(response.usage)
+            if usage:
+                slot.report_usage(usage["total_tokens"])
         assistant_reply = response.choices[0].message.content
-        total_tokens += current_tokens + count_tokens(assistant_reply)
+        finish_reason = response.choices[0].finish_reason
+        settled = True
+    except CircuitOpenError:
+        settled = True
+        await AsyncTurnService.release_turn(prepared.turn)
+        return API_UNAVAILABLE_TEXT
+    except Exception as e:
+        settled = True
+        logger.error("DeepSeek request failed for user %s: %s", telegram_id, e)
+        await AsyncTurnService.release_turn(prepared.turn)
+        return API_ERROR_TEXT
+    finally:
+        # CancelledError не ловится except Exception — резерв возвращаем здесь
+        if not settled:
+            await _abandon_turn(prepared, [], None)
 
-        await AsyncUserService.add_tokens_used(
-            telegram_id=telegram_id,
-            tokens_used=total_tokens
-        )
+    await _save_reply(prepared, assistant_reply, usage)
+    await _store_reply(prepared, assistant_reply, usage, finish_reason)
+    return assistant_reply
 
-        await AsyncDialogueService.add_message(
-            telegram_id=telegram_id,
-            role="assistant",
-            content=assistant_reply
-        )
 
-        return assistant_reply
+async def stream_request(telegram_id: int, user_message: str) -> AsyncIterator[str]:
+    """
+    Потоковый вариант standard_request.
 
+    Args:
+        telegram_id: ID пользователя в Telegram
+        user_message: Сообщение пользователя
+
+    Yields:
+        Фрагменты ответа ассистента по мере генерации
+    """
+    prepared = await _prepare_messages(telegram_id, user_message)
+    if isinstance(prepared, str):
+        yield prepared
+        return
+
+    cached_reply = await _cached_reply(prepared)
+    if cached_reply is not None:
+        yield cached_reply
+        return
+
+    parts = []
+    usage = None
+    finish_reason = None
+    settled = False
+    try:
+        # Слот занят до конца потока
+        async with llm_scheduler.slot(
+            telegram_id,
+            prepared.prompt_tokens + prepared.max_tokens,
+            premium=prepared.premium
+        ) as slot:
+            async for chunk in stream_chat_completion(
+                model="deepseek-chat",
+                messages=prepared.messages,
+                max_tokens=prepared.max_tokens,
+                stream_options={"include_usage": True}
+            ):
+                # usage приходит в последнем чанке, обычно с пустым choices
+                if chunk.usage:
+                    usage = extract_usage(chunk.usage)
+                    slot.report_usage(usage["total_tokens"])
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        settled = True
+    except CircuitOpenError:
+        settled = True
+        await AsyncTurnService.release_turn(prepared.turn)
+        yield API_UNAVAILABLE_TEXT
+        return
     except Exception as e:
-        print(f"API error: {e}")
-        return "Произошла ошибка при обращении к AI. Попробуйте позже."
\ No newline at end of file
+        settled = True
+        logger.error("DeepSeek request failed for user %s: %s", telegram_id, e)
+        if not parts:
+            await AsyncTurnService.release_turn(prepared.turn)
+            yield API_ERROR_TEXT
+            return
+    finally:
+        # Потребитель закрыл генератор (ошибка Telegram) или задачу отменили:
+        # GeneratorExit/CancelledError минуют except Exception, ход завершаем здесь
+        if not settled:
+            await _abandon_turn(prepared, parts, usage)
+
+    # Частично полученный ответ тоже сохраняем: токены уже потрачены
+    assistant_reply = "".join(parts)
+    await _save_reply(prepared, assistant_reply, usage)
+    await _store_reply(prepared, assistant_reply, usage, finish_reason)
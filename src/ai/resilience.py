@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # включая APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+
+class CircuitOpenError(Exception):
+    """Провайдер недоступен: запрос отклонён без обращения к API."""
+
+
+class CircuitBreaker:
+    """
+    closed — запросы идут как обычно;
+    open — после failure_threshold ошибок подряд запросы сразу отклоняются;
+    half-open — через recovery_timeout пропускается один пробный запрос,
+    его успех закрывает цепь, ошибка снова открывает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        now = time.monotonic()
+        if self._state == self.CLOSED:
+            return True
+
+        if self._state == self.OPEN:
+            if now - self._opened_at < self._recovery_timeout:
+                return False
+            self._state = self.HALF_OPEN
+            self._probe_started_at = None
+
+        # half-open: одна проба за раз; зависшая проба не блокирует цепь навсегда
+        if self._probe_started_at is None or now - self._probe_started_at >= self._recovery_timeout:
+            self._probe_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info("Circuit closed: provider recovered")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_started_at = None
+
+    def release_probe(self) -> None:
+        """Запрос завершился без вывода о здоровье провайдера: счётчики не меняем, пробу освобождаем."""
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning("Circuit opened after %s failures", self._failures)
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    """Экспоненциальные повторы с полным джиттером и учётом Retry-After."""
+
+    def __init__(
+            self,
+            breaker: CircuitBreaker,
+            max_attempts: int = 3,
+            base_delay: float = 0.5,
+            max_delay: float = 8.0
+    ):
+        self._breaker = breaker
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+
+    def _delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """Пауза перед следующей попыткой или None, если повторять не стоит."""
+        if attempt + 1 >= self._max_attempts:
+            return None
+
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Ждать дольше max_delay, удерживая слот планировщика, нет смысла
+            return retry_after if retry_after <= self._max_delay else None
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    def _check_circuit(self) -> None:
+        if not self._breaker.allow_request():
+            raise CircuitOpenError("DeepSeek API is temporarily unavailable")
+
+    def _on_error(self, attempt: int, error: Exception) -> Optional[float]:
+        if not isinstance(error, RETRYABLE_ERRORS):
+            # Ошибки запроса (4xx) не говорят ни о недоступности, ни о восстановлении
+            # провайдера: серия 401 не должна сбрасывать накопленные сбои
+            self._breaker.release_probe()
+            return None
+
+        # Сбой засчитывается цепи один раз на запрос — когда повторять больше не будем;
+        # неудачная проба в half-open не повторяется и сразу размыкает цепь
+        delay = self._delay(attempt, error)
+        if delay is None or self._breaker.state == CircuitBreaker.HALF_OPEN:
+            self._breaker.record_failure()
+            return None
+
+        logger.warning("Retrying DeepSeek request in %.2fs after error: %s", delay, error)
+        return delay
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        attempt = 0
+        while True:
+            self._check_circuit()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            self._breaker.record_success()
+            return result
+
+    async def stream(self, func: Callable[..., AsyncIterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Повторяет потоковый запрос только до первого чанка: после начала
+        ответа пользователь уже видит текст, и повтор его бы задублировал.
+        """
+        attempt = 0
+        while True:
+            self._check_circuit()
+            stream = func(*args, **kwargs)
+            try:
+                first_chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                self._breaker.record_success()
+                return
+            except Exception as e:
+                await stream.aclose()
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            break
+
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        except RETRYABLE_ERRORS:
+            self._breaker.record_failure()
+            raise
+        finally:
+            await stream.aclose()
+        self._breaker.record_success()
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.config import _Config
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    content: str
+    token_count: int
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def make_cache_key(messages: List[Dict]) -> str:
+    """Хэш нормализованного системного промпта и списка сообщений."""
+    normalized = [[message["role"], _normalize(message["content"])] for message in messages]
+    payload = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IResponseCache(ABC):
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, response: CachedResponse) -> None:
+        pass
+
+
+class InMemoryResponseCache(IResponseCache):
+    """LRU-кэш ответов с TTL в памяти процесса."""
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600.0):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+
+_response_cache: Optional[IResponseCache] = (
+    InMemoryResponseCache(
+        maxsize=_Config.RESPONSE_CACHE_SIZE,
+        ttl=_Config.RESPONSE_CACHE_TTL
+    )
+    if _Config.RESPONSE_CACHE_ENABLED else None
+)
+
+
+def get_response_cache() -> Optional[IResponseCache]:
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[IResponseCache]) -> None:
+    """Подменяет бэкенд кэша (например, на общий для нескольких процессов)."""
+    global _response_cache
+    _response_cache = cache
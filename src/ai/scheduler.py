@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from src.config import _Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SchedulerMetrics:
+    admitted: int = 0
+    admitted_premium: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.admitted if self.admitted else 0.0
+
+
+class _Waiter:
+    __slots__ = ("telegram_id", "tokens", "premium", "future", "enqueued_at", "used_tokens")
+
+    def __init__(self, telegram_id: int, tokens: int, premium: bool):
+        self.telegram_id = telegram_id
+        self.tokens = tokens
+        self.premium = premium
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.used_tokens: Optional[int] = None
+
+    def report_usage(self, tokens: int) -> None:
+        """Фактический расход токенов — корректирует бюджет TPM."""
+        self.used_tokens = tokens
+
+
+class LLMScheduler:
+    """
+    Допуск запросов к модели.
+
+    - не больше max_concurrency запросов одновременно;
+    - бюджет токенов в минуту (token bucket);
+    - честная очередь: внутри класса пользователи обслуживаются по кругу,
+      premium получает premium_share мест подряд, затем одно — free,
+      а у одного пользователя не больше max_inflight_per_user запросов.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            tokens_per_minute: int,
+            max_inflight_per_user: int = 1,
+            premium_share: int = 3
+    ):
+        self._max_concurrency = max_concurrency
+        self._tokens_per_minute = tokens_per_minute
+        self._max_inflight_per_user = max_inflight_per_user
+        self._premium_share = premium_share
+
+        self._budget = float(tokens_per_minute)
+        self._budget_updated_at = time.monotonic()
+
+        self._queues: Dict[bool, "OrderedDict[int, Deque[_Waiter]]"] = {
+            True: OrderedDict(),
+            False: OrderedDict()
+        }
+        self._in_flight = 0
+        self._in_flight_by_user: Dict[int, int] = {}
+        self._premium_streak = 0
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+
+        self.metrics = SchedulerMetrics()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(waiters) for queue in self._queues.values() for waiters in queue.values())
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self._in_flight,
+            "admitted": self.metrics.admitted,
+            "admitted_premium": self.metrics.admitted_premium,
+            "avg_wait_seconds": round(self.metrics.avg_wait_seconds, 3),
+            "max_wait_seconds": round(self.metrics.max_wait_seconds, 3),
+            "token_budget": int(self._budget)
+        }
+
+    @asynccontextmanager
+    async def slot(self, telegram_id: int, estimated_tokens: int, premium: bool = False) -> AsyncIterator[_Waiter]:
+        """
+        Ждёт своей очереди и держит слот до выхода из контекста.
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            estimated_tokens: Оценка расхода (промпт + max_tokens)
+            premium: Пользователь с premium-подпиской
+        """
+        waiter = _Waiter(telegram_id, estimated_tokens, premium)
+        self._queues[premium].setdefault(telegram_id, deque()).append(waiter)
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(waiter)
+            else:
+                self._discard(waiter)
+            raise
+
+        wait = time.monotonic() - waiter.enqueued_at
+        self.metrics.admitted += 1
+        self.metrics.admitted_premium += int(premium)
+        self.metrics.total_wait_seconds += wait
+        self.metrics.max_wait_seconds = max(self.metrics.max_wait_seconds, wait)
+
+        try:
+            yield waiter
+        finally:
+            self._release(waiter)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._budget_updated_at
+        self._budget_updated_at = now
+        self._budget = min(
+            float(self._tokens_per_minute),
+            self._budget + elapsed * self._tokens_per_minute / 60
+        )
+
+    def _dispatch(self) -> None:
+        self._refill()
+        while self._in_flight < self._max_concurrency:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+
+            # Запрос крупнее всего бюджета ждёт полного ведра, а не вечно
+            needed = min(waiter.tokens, self._tokens_per_minute)
+            if self._budget < needed:
+                self._schedule_retry((needed - self._budget) * 60 / self._tokens_per_minute)
+                return
+
+            self._pop(waiter)
+            self._budget -= waiter.tokens
+            self._in_flight += 1
+            self._in_flight_by_user[waiter.telegram_id] = self._in_flight_by_user.get(waiter.telegram_id, 0) + 1
+            waiter.future.set_result(None)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        premium = self._first_eligible(self._queues[True])
+        free = self._first_eligible(self._queues[False])
+        if premium and (free is None or self._premium_streak < self._premium_share):
+            return premium
+        return free or premium
+
+    def _first_eligible(self, queue: "OrderedDict[int, Deque[_Waiter]]") -> Optional[_Waiter]:
+        for telegram_id, waiters in queue.items():
+            if self._in_flight_by_user.get(telegram_id, 0) < self._max_inflight_per_user:
+                return waiters[0]
+        return None
+
+    def _pop(self, waiter: _Waiter) -> None:
+        queue = self._queues[waiter.premium]
+        waiters = queue[waiter.telegram_id]
+        waiters.popleft()
+        # Пользователь уходит в конец круга
+        del queue[waiter.telegram_id]
+        if waiters:
+            queue[waiter.telegram_id] = waiters
+        self._premium_streak = self._premium_streak + 1 if waiter.premium else 0
+
+    def _discard(self, waiter: _Waiter) -> None:
+        queue = self._queues[waiter.premium]
+        waiters = queue.get(waiter.telegram_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del queue[waiter.telegram_id]
+
+    def _release(self, waiter: _Waiter) -> None:
+        self._in_flight -= 1
+        in_flight = self._in_flight_by_user.get(waiter.telegram_id, 1) - 1
+        if in_flight:
+            self._in_flight_by_user[waiter.telegram_id] = in_flight
+        else:
+            self._in_flight_by_user.pop(waiter.telegram_id, None)
+
+        if waiter.used_tokens is not None:
+            # Возвращаем в бюджет разницу между оценкой и фактом
+            self._budget += waiter.tokens - waiter.used_tokens
+        self._dispatch()
+
+    def _schedule_retry(self, delay: float) -> None:
+        if self._retry_handle and not self._retry_handle.cancelled():
+            return
+
+        def retry():
+            self._retry_handle = None
+            self._dispatch()
+
+        self._retry_handle = asyncio.get_running_loop().call_later(delay, retry)
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=_Config.DEEPSEEK_MAX_CONCURRENCY,
+    tokens_per_minute=_Config.LLM_TOKENS_PER_MINUTE,
+    max_inflight_per_user=_Config.LLM_MAX_INFLIGHT_PER_USER,
+    premium_share=_Config.LLM_PREMIUM_SHARE
+)
@@ -0,0 +1,137 @@
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from src.config import _Config
+from .response_cache import CachedResponse
+
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def numbers_key(text: str) -> int:
+    """
+    Ключ чисел вопроса. Вопросы с разными числами («февраль 2024» и
+    «февраль 2023») похожи по n-граммам, но требуют разных ответов.
+    """
+    return hash(tuple(NUMBER_PATTERN.findall(text)))
+
+
+@dataclass
+class SemanticCacheMetrics:
+    lookups: int = 0
+    hits: int = 0
+    last_hit_similarity: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class HashedNgramEmbedder:
+    """
+    Эмбеддинги без модели: символьные n-граммы слов хэшируются
+    в вектор фиксированной длины и нормализуются (L2).
+    """
+
+    def __init__(self, dim: int = 1024, ngram_sizes: tuple = (3, 4, 5)):
+        self._dim = dim
+        self._ngram_sizes = ngram_sizes
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self._dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.casefold()):
+            padded = f"<{word}>"
+            for n in self._ngram_sizes:
+                for i in range(max(len(padded) - n + 1, 1)):
+                    digest = hashlib.blake2b(padded[i:i + n].encode(), digest_size=8).digest()
+                    bucket = int.from_bytes(digest[:4], "little") % self._dim
+                    sign = 1.0 if digest[4] & 1 else -1.0
+                    vector[bucket] += sign
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    Кэш ответов на перефразированные первые вопросы.
+
+    Векторы лежат в одной матрице NumPy, поиск ближайшего — одно
+    матричное умножение; вытесняется самая давно использованная запись.
+    """
+
+    def __init__(
+            self,
+            embedder: HashedNgramEmbedder,
+            capacity: int = 5000,
+            threshold: float = 0.95,
+            ttl: float = 3600.0
+    ):
+        self._embedder = embedder
+        self._capacity = capacity
+        self._threshold = threshold
+        self._ttl = ttl
+        self._vectors = np.zeros((capacity, embedder.dim), dtype=np.float32)
+        self._responses: List[Optional[CachedResponse]] = [None] * capacity
+        self._expires_at = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._numbers = np.zeros(capacity, dtype=np.int64)
+        self.metrics = SemanticCacheMetrics()
+
+    def stats(self) -> dict:
+        return {
+            "semantic_lookups": self.metrics.lookups,
+            "semantic_hits": self.metrics.hits,
+            "semantic_hit_rate": round(self.metrics.hit_rate, 3),
+            "semantic_last_hit_similarity": round(self.metrics.last_hit_similarity, 3)
+        }
+
+    def get(self, prompt: str) -> Optional[CachedResponse]:
+        self.metrics.lookups += 1
+        now = time.monotonic()
+        alive = self._expires_at > now
+        if not alive.any():
+            return None
+
+        similarities = self._vectors @ self._embedder.embed(prompt)
+        # Попадание возможно только при точном совпадении чисел
+        similarities[~alive | (self._numbers != numbers_key(prompt))] = -1.0
+        index = int(np.argmax(similarities))
+        if similarities[index] < self._threshold:
+            return None
+
+        self._last_used[index] = now
+        self.metrics.hits += 1
+        self.metrics.last_hit_similarity = float(similarities[index])
+        return self._responses[index]
+
+    def set(self, prompt: str, response: CachedResponse) -> None:
+        now = time.monotonic()
+        # Свободная или просроченная ячейка, иначе — давно не использованная
+        expired = np.flatnonzero(self._expires_at <= now)
+        index = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+
+        self._vectors[index] = self._embedder.embed(prompt)
+        self._responses[index] = response
+        self._numbers[index] = numbers_key(prompt)
+        self._expires_at[index] = now + self._ttl
+        self._last_used[index] = now
+
+
+semantic_cache: Optional[SemanticCache] = (
+    SemanticCache(
+        HashedNgramEmbedder(dim=_Config.SEMANTIC_CACHE_DIM),
+        capacity=_Config.SEMANTIC_CACHE_SIZE,
+        threshold=_Config.SEMANTIC_CACHE_THRESHOLD,
+        ttl=_Config.SEMANTIC_CACHE_TTL
+    )
+    if _Config.SEMANTIC_CACHE_ENABLED else None
+)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from .api_client import create_chat_completion, extract_usage, prompt_cache_metrics
+from .scheduler import llm_scheduler
+from .tokenizer import count_tokens_async, count_tokens_batch_async, MESSAGE_TOKEN_OVERHEAD
+from src.database.CRUDs.dialogue import AsyncDialogueService, MessageDTO
+from src.config import _Config
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = "Ты сжимаешь переписку пользователя с ассистентом. \
+Обнови резюме с учётом новых сообщений: сохрани факты о пользователе, его цели, \
+принятые решения и открытые вопросы. Пиши кратко, от третьего лица, без вступлений."
+
+ROLE_LABELS = {"user": "Пользователь", "assistant": "Ассистент"}
+
+
+def _select_batch(messages: List[MessageDTO]) -> List[MessageDTO]:
+    """
+    Старые сообщения для сжатия (последние SUMMARY_KEEP_RECENT отсекает
+    запрос), объём одного прохода ограничен SUMMARY_BATCH_TOKENS.
+    """
+    batch = []
+    tokens = 0
+    for message in messages:
+        tokens += (message.token_count or 0) + MESSAGE_TOKEN_OVERHEAD
+        if batch and tokens > _Config.SUMMARY_BATCH_TOKENS:
+            break
+        batch.append(message)
+    return batch
+
+
+def _build_prompt(summary: Optional[str], batch: List[MessageDTO]) -> str:
+    transcript = "\n".join(
+        f"{ROLE_LABELS.get(message.role, message.role)}: {message.content}"
+        for message in batch
+    )
+    return f"Текущее резюме:\n{summary or '—'}\n\nНовые сообщения:\n{transcript}"
+
+
+async def summarize_dialogue(dialogue_id: int) -> bool:
+    """
+    Сжимает очередную порцию старых сообщений диалога в резюме.
+
+    Args:
+        dialogue_id: ID диалога
+
+    Returns:
+        True, если резюме обновлено
+    """
+    dialogue, messages = await AsyncDialogueService.get_unsummarized_messages(
+        dialogue_id,
+        keep_recent=_Config.SUMMARY_KEEP_RECENT,
+        max_tokens=_Config.SUMMARY_BATCH_TOKENS
+    )
+    if dialogue is None:
+        return False
+
+    batch = _select_batch(messages)
+    if not batch:
+        return False
+
+    prompt = _build_prompt(dialogue.summary, batch)
+    request_messages = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    estimated_tokens = sum(await count_tokens_batch_async([SUMMARY_PROMPT, prompt])) + _Config.SUMMARY_MAX_TOKENS
+
+    # Отрицательный ключ не пересекается с очередями пользователей
+    async with llm_scheduler.slot(-dialogue_id, estimated_tokens) as slot:
+        response = await create_chat_completion(
+            model="deepseek-chat",
+            messages=request_messages,
+            max_tokens=_Config.SUMMARY_MAX_TOKENS
+        )
+        usage = extract_usage(response.usage)
+        if usage:
+            slot.report_usage(usage["total_tokens"])
+    prompt_cache_metrics.record(usage)
+
+    summary = (response.choices[0].message.content or "").strip()
+    if not summary:
+        return False
+
+    token_count = usage["completion_tokens"] if usage else await count_tokens_async(summary)
+    return await AsyncDialogueService.save_summary(
+        dialogue_id=dialogue_id,
+        summary=summary,
+        token_count=token_count,
+        summary_seq=batch[-1].seq
+    )
+
+
+async def summarize_dialogues():
+    """Фоновая задача: сжимает диалоги, у которых накопилась длинная несжатая история."""
+    while True:
+        await asyncio.sleep(_Config.SUMMARY_INTERVAL)
+        try:
+            active_since = datetime.utcnow() - timedelta(seconds=_Config.SUMMARY_ACTIVE_WINDOW)
+            dialogue_ids = await AsyncDialogueService.get_dialogues_to_summarize(
+                min_tokens=_Config.SUMMARY_TRIGGER_TOKENS,
+                active_since=active_since,
+                keep_recent=_Config.SUMMARY_KEEP_RECENT,
+                limit=_Config.SUMMARY_BATCH_DIALOGUES
+            )
+        except Exception as e:
+            logger.error("Error while selecting dialogues to summarize: %s", e)
+            continue
+
+        for dialogue_id in dialogue_ids:
+            try:
+                await summarize_dialogue(dialogue_id)
+            except Exception as e:
+                logger.error("Error while summarizing dialogue %s: %s", dialogue_id, e)
@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Sequence
+
+import tiktoken
+
+from src.config import _Config
+
+DEFAULT_MODEL = "deepseek-chat"
+FALLBACK_ENCODING = "cl100k_base"
+
+# Служебные токены, которые API добавляет к каждому сообщению
+MESSAGE_TOKEN_OVERHEAD = 5
+
+# tiktoken отпускает GIL во время кодирования, поэтому хватает потоков
+_executor = ThreadPoolExecutor(
+    max_workers=_Config.TOKENIZER_THREADS,
+    thread_name_prefix="tokenizer"
+)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL) -> tiktoken.Encoding:
+    """Кодировка определяется один раз на процесс."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    # encode_ordinary: спецтокены во вводе пользователя считаются обычным текстом
+    return len(get_encoding().encode_ordinary(text))
+
+
+def count_tokens_batch(texts: Sequence[str]) -> List[int]:
+    encoding = get_encoding()
+    return [len(encoding.encode_ordinary(text)) for text in texts]
+
+
+async def count_tokens_async(text: str) -> int:
+    """Короткие тексты считаются сразу, длинные — в пуле, не блокируя event loop."""
+    if len(text) <= _Config.TOKENIZER_INLINE_CHARS:
+        return count_tokens(text)
+    return await asyncio.get_running_loop().run_in_executor(_executor, count_tokens, text)
+
+
+async def count_tokens_batch_async(texts: Sequence[str]) -> List[int]:
+    """Считает токены сразу для многих текстов одной задачей пула."""
+    if sum(len(text) for text in texts) <= _Config.TOKENIZER_INLINE_CHARS:
+        return count_tokens_batch(texts)
+    return await asyncio.get_running_loop().run_in_executor(_executor, count_tokens_batch, list(texts))
+
+
+def shutdown_tokenizer() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,8 @@
+import logging
 from aiogram import Router
 
+logger = logging.getLogger(__name__)
+
 main_router = Router()
 try:
     from .start import user_router as start_router
@@ -11,5 +14,5 @@ try:
     main_router.include_router(chat_router)
     main_router.include_router(admin_router)
     main_router.include_router(payment_router)
-except Exception as e:
-    print(f'File src/bot/handlers/__init__.py, Error:{e}')
\ No newline at end of file
+except Exception:
+    logger.exception("Failed to register handlers")
\ No newline at end of file
@@ -1,6 +1,9 @@
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
+from src.ai.api_client import prompt_cache_metrics
+from src.ai.scheduler import llm_scheduler
+from src.ai.semantic_cache import semantic_cache
 from src.config import _Config
 from src.database.CRUDs.subscription import AsyncSubscriptionService
 user_router = Router()
@@ -20,3 +23,14 @@ async def grant_premium(message: Message, days: int = 30):
 
     await AsyncSubscriptionService.create_subscription(target_user_id, "premium", days)
     await message.answer(f"✅ Подписка выдана на {days} дней")
+
+
+@user_router.message(Command("llm_stats"))
+async def llm_stats(message: Message):
+    if not await is_admin(message.from_user.id):
+        return
+    stats = llm_scheduler.stats()
+    stats.update(prompt_cache_metrics.stats())
+    if semantic_cache:
+        stats.update(semantic_cache.stats())
+    await message.answer("\n".join(f"{key}: {value}" for key, value in stats.items()))
@@ -1,25 +1,57 @@
+import logging
+from contextlib import aclosing
+from typing import List
+
 from aiogram import Router, F
 from aiogram.types import Message
-from src.ai.prompt_manager import standard_request
-from src.database.CRUDs.user import AsyncUserService
+from src.ai.prompt_manager import standard_request, stream_request
+from src.bot.message_streamer import MessageStreamer
+from src.bot.turn_queue import UserTurnQueue
+from src.config import _Config
+
+logger = logging.getLogger(__name__)
 
 user_router = Router()
 
-@user_router.message(F.text & ~F.text.startswith('/'))
-async def user_message(message: Message):
-    try:
-        can_chat, text = await AsyncUserService.check_limit_tokens(message.from_user.id)
-        if not can_chat:
-            return await message.answer("Достигнут лимит токенов.")
 
+async def process_turn(messages: List[Message]):
+    # Несколько сообщений подряд уходят модели одним запросом, отвечаем на последнее
+    message = messages[-1]
+    user_text = "\n\n".join(m.text for m in messages)
+    try:
+        # Проверка лимита выполняется внутри хода диалога (AsyncTurnService)
         typing_msg = await message.answer("Думаю...")
 
+        if _Config.STREAM_RESPONSES:
+            streamer = MessageStreamer(typing_msg, edit_interval=_Config.STREAM_EDIT_INTERVAL)
+            # aclosing: при ошибке отправки генератор закрывается сразу и успевает завершить ход
+            async with aclosing(stream_request(
+                telegram_id=message.from_user.id,
+                user_message=user_text
+            )) as deltas:
+                async for delta in deltas:
+                    await streamer.push(delta)
+            await streamer.finish(parse_mode="Markdown")
+            return
+
         response = await standard_request(
             telegram_id=message.from_user.id,
-            user_message=message.text
+            user_message=user_text
         )
 
         await typing_msg.delete()
         await message.answer(response, parse_mode="Markdown")
-    except Exception as e:
-        print(f"Ошибка: {e}")
\ No newline at end of file
+    except Exception:
+        logger.exception("Failed to process turn for user %s", message.from_user.id)
+
+
+turn_queue = UserTurnQueue(
+    process_turn,
+    debounce=_Config.TURN_DEBOUNCE_SECONDS,
+    max_batch=_Config.TURN_MAX_BATCH
+)
+
+
+@user_router.message(F.text & ~F.text.startswith('/'))
+async def user_message(message: Message):
+    await turn_queue.submit(message.from_user.id, message)
@@ -52,10 +52,3 @@ async def buy_premium_handler(message: Message):
     )
 
 
-    await PaymentManager.start_background_check(
-        payment_id=payment_data["payment_id"],
-        telegram_id=telegram_id,
-        timeout_minutes=5
-    )
-
-
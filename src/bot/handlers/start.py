@@ -1,6 +1,5 @@
 from aiogram.filters import Command
 from aiogram import types, Router
-from src.database.CRUDs.subscription import AsyncSubscriptionService
 from src.database.CRUDs.user import AsyncUserService
 
 user_router = Router()
@@ -24,12 +23,11 @@ async def cmd_help(message: types.Message):
 
 @user_router.message(Command("limit"))
 async def cmd_limit(message: types.Message):
-    active_sub = await AsyncSubscriptionService.get_active_subscription(message.from_user.id)
+    quota = await AsyncUserService.get_quota_state(message.from_user.id)
+    if quota is None:
+        await message.answer("Зарегистрируйтесь с помощью команды /start, или напишите в поддержку")
+        return
     text = "Привилегии: "
-    if active_sub:
-        text += active_sub.type + "\n\n"
-    else:
-        text += "free\n\n"
-    can_chat, temp_text = await AsyncUserService.check_limit_tokens(message.from_user.id)
-    text += temp_text
+    text += (quota.subscription_type or "free") + "\n\n"
+    text += f"{quota.tokens_used_today}/{quota.daily_token_limit} токенов"
     await message.answer(text)
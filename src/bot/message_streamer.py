@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class MessageStreamer:
+    """
+    Постепенно редактирует сообщение-заглушку по мере генерации ответа.
+
+    Фрагменты копятся в буфере, а edit_message_text вызывается не чаще
+    одного раза в edit_interval секунд, чтобы не упираться в лимиты Telegram.
+    """
+
+    def __init__(self, message: Message, edit_interval: float = 1.0, min_chars: int = 20):
+        self._message = message
+        self._edit_interval = edit_interval
+        self._min_chars = min_chars
+        self._parts: List[str] = []
+        self._length = 0
+        self._sent_length = 0
+        self._last_edit = 0.0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    async def push(self, delta: str) -> None:
+        self._parts.append(delta)
+        self._length += len(delta)
+
+        # Первый фрагмент показываем сразу, дальше — не чаще edit_interval
+        if self._sent_length >= TELEGRAM_MESSAGE_LIMIT:
+            return
+        if self._sent_length and self._length - self._sent_length < self._min_chars:
+            return
+        if time.monotonic() - self._last_edit < self._edit_interval:
+            return
+        # Промежуточные правки без разметки: незакрытый Markdown не парсится
+        await self._edit(self.text[:TELEGRAM_MESSAGE_LIMIT])
+
+    async def finish(self, parse_mode: Optional[str] = "Markdown") -> None:
+        text = self.text
+        if not text:
+            await self._edit("Пустой ответ от AI. Попробуйте переформулировать запрос.")
+            return
+
+        chunks = [
+            text[i:i + TELEGRAM_MESSAGE_LIMIT]
+            for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)
+        ]
+        await self._edit(chunks[0], parse_mode=parse_mode, force=True)
+        for chunk in chunks[1:]:
+            try:
+                await self._message.answer(chunk, parse_mode=parse_mode)
+            except TelegramBadRequest:
+                await self._message.answer(chunk)
+
+    async def _edit(self, text: str, parse_mode: Optional[str] = None, force: bool = False) -> None:
+        try:
+            await self._message.edit_text(text, parse_mode=parse_mode)
+        except TelegramRetryAfter as e:
+            if not force:
+                # Пропускаем правку: следующая придёт с накопленным текстом
+                self._last_edit = time.monotonic() + e.retry_after
+                return
+            await asyncio.sleep(e.retry_after)
+            await self._edit(text, parse_mode=parse_mode, force=force)
+            return
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                pass
+            elif parse_mode:
+                await self._edit(text, force=force)
+                return
+            else:
+                logger.warning("Failed to edit streamed message: %s", e)
+        self._sent_length = len(text)
+        self._last_edit = time.monotonic()
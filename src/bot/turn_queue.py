@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+TurnHandler = Callable[[List[Message]], Awaitable[None]]
+
+
+class UserTurnQueue:
+    """
+    Очередь ходов диалога: для каждого telegram_id одновременно
+    выполняется не больше одного хода.
+
+    Сообщения, пришедшие пока ход выполняется (или в пределах debounce),
+    объединяются в одну пачку и обрабатываются одним запросом к модели.
+    """
+
+    def __init__(self, handler: TurnHandler, debounce: float = 0.0, max_batch: int = 5):
+        self._handler = handler
+        self._debounce = debounce
+        self._max_batch = max_batch
+        self._pending: Dict[int, List[Message]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+    def pending_count(self, telegram_id: int) -> int:
+        return len(self._pending.get(telegram_id, []))
+
+    async def submit(self, telegram_id: int, message: Message) -> None:
+        self._pending.setdefault(telegram_id, []).append(message)
+        if telegram_id not in self._workers:
+            self._workers[telegram_id] = asyncio.create_task(self._worker(telegram_id))
+
+    async def _worker(self, telegram_id: int) -> None:
+        try:
+            while True:
+                if self._debounce:
+                    await asyncio.sleep(self._debounce)
+
+                batch = self._pending.pop(telegram_id, None)
+                if not batch:
+                    break
+
+                if len(batch) > self._max_batch:
+                    logger.info("Dropped %s superseded messages from %s", len(batch) - self._max_batch, telegram_id)
+                    batch = batch[-self._max_batch:]
+
+                try:
+                    await self._handler(batch)
+                except Exception as e:
+                    logger.error("Error while processing turn for %s: %s", telegram_id, e)
+        finally:
+            self._workers.pop(telegram_id, None)
@@ -15,6 +15,119 @@ class Config:
     YUKASSA_SHOP_ID = os.getenv("YUKASSA_SHOP_ID")
     YUKASSA_SECRET_KEY = os.getenv("YUKASSA_SECRET_KEY")
 
+    # YooKassa: общий пул keep-alive соединений и таймауты запросов
+    YUKASSA_MAX_CONNECTIONS = int(os.getenv("YUKASSA_MAX_CONNECTIONS", "20"))
+    YUKASSA_KEEPALIVE_TIMEOUT = float(os.getenv("YUKASSA_KEEPALIVE_TIMEOUT", "30"))
+    YUKASSA_REQUEST_TIMEOUT = float(os.getenv("YUKASSA_REQUEST_TIMEOUT", "15"))
+    YUKASSA_CONNECT_TIMEOUT = float(os.getenv("YUKASSA_CONNECT_TIMEOUT", "5"))
+
+    # Уведомления YooKassa (payment.succeeded/payment.canceled); без них — частый опрос
+    YUKASSA_WEBHOOK_ENABLED = os.getenv("YUKASSA_WEBHOOK_ENABLED", "false").lower() == "true"
+    YUKASSA_WEBHOOK_PATH = os.getenv("YUKASSA_WEBHOOK_PATH", "/yookassa/webhook")
+    # Прокси, которым доверяем заголовок X-Forwarded-For
+    YUKASSA_TRUSTED_PROXIES = [
+        ip.strip() for ip in os.getenv("YUKASSA_TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if ip.strip()
+    ]
+    YUKASSA_POLL_INTERVAL = float(os.getenv("YUKASSA_POLL_INTERVAL", "60" if YUKASSA_WEBHOOK_ENABLED else "10"))
+    # Сверка ожидающих платежей из таблицы payments одной фоновой задачей
+    YUKASSA_RECONCILE_TICK = float(os.getenv("YUKASSA_RECONCILE_TICK", "5"))
+    YUKASSA_RECONCILE_BATCH = int(os.getenv("YUKASSA_RECONCILE_BATCH", "100"))
+    YUKASSA_RECONCILE_CONCURRENCY = int(os.getenv("YUKASSA_RECONCILE_CONCURRENCY", "10"))
+    YUKASSA_PAYMENT_TTL_HOURS = int(os.getenv("YUKASSA_PAYMENT_TTL_HOURS", "24"))
+
+    # DeepSeek: пул соединений, таймауты и лимит одновременных запросов
+    # (DEEPSEEK_MAX_CONCURRENCY соблюдает планировщик src/ai/scheduler.py)
+    DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+    DEEPSEEK_REQUEST_TIMEOUT = float(os.getenv("DEEPSEEK_REQUEST_TIMEOUT", "60"))
+    DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "5"))
+    DEEPSEEK_MAX_CONNECTIONS = int(os.getenv("DEEPSEEK_MAX_CONNECTIONS", "100"))
+    DEEPSEEK_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "100"))
+    DEEPSEEK_MAX_ATTEMPTS = int(os.getenv("DEEPSEEK_MAX_ATTEMPTS", "3"))
+    DEEPSEEK_RETRY_BASE_DELAY = float(os.getenv("DEEPSEEK_RETRY_BASE_DELAY", "0.5"))
+    DEEPSEEK_RETRY_MAX_DELAY = float(os.getenv("DEEPSEEK_RETRY_MAX_DELAY", "8"))
+    DEEPSEEK_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("DEEPSEEK_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    DEEPSEEK_CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("DEEPSEEK_CIRCUIT_RECOVERY_TIMEOUT", "30"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+    LLM_MAX_INFLIGHT_PER_USER = int(os.getenv("LLM_MAX_INFLIGHT_PER_USER", "1"))
+    LLM_PREMIUM_SHARE = int(os.getenv("LLM_PREMIUM_SHARE", "3"))
+
+    # Потоковые ответы: заглушка "Думаю..." редактируется по мере генерации
+    STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+    STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+
+    # Кэш ответов на одинаковые запросы без истории
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_MAX_MESSAGES = int(os.getenv("RESPONSE_CACHE_MAX_MESSAGES", "1"))
+
+    # Семантический кэш: ответы на перефразированные первые вопросы
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+    SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+    SEMANTIC_CACHE_MAX_CHARS = int(os.getenv("SEMANTIC_CACHE_MAX_CHARS", "500"))
+
+    # Кэш квот пользователей в памяти процесса
+    QUOTA_CACHE_SIZE = int(os.getenv("QUOTA_CACHE_SIZE", "10000"))
+    QUOTA_CACHE_TTL = float(os.getenv("QUOTA_CACHE_TTL", "300"))
+
+    # Очередь ходов: сообщения одного пользователя обрабатываются по очереди,
+    # пришедшие за время ответа (или за debounce) объединяются в один запрос
+    TURN_DEBOUNCE_SECONDS = float(os.getenv("TURN_DEBOUNCE_SECONDS", "0"))
+    TURN_MAX_BATCH = int(os.getenv("TURN_MAX_BATCH", "5"))
+
+    # Получение обновлений: polling или webhook (aiohttp-сервер за reverse proxy)
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+    # Регистрировать webhook в Telegram при старте (достаточно одного процесса)
+    WEBHOOK_SET_ON_STARTUP = os.getenv("WEBHOOK_SET_ON_STARTUP", "true").lower() == "true"
+    # Фоновые задачи с записью в БД должны работать только в одном процессе
+    RUN_BACKGROUND_TASKS = os.getenv("RUN_BACKGROUND_TASKS", "true").lower() == "true"
+
+    # Супервизор: N процессов-воркеров на локальных портах, начиная с базового.
+    # Лимиты DeepSeek (конкурентность, соединения, TPM) делятся между воркерами поровну
+    SUPERVISOR_WORKERS = int(os.getenv("SUPERVISOR_WORKERS", str(os.cpu_count() or 1)))
+    SUPERVISOR_WORKER_HOST = os.getenv("SUPERVISOR_WORKER_HOST", "127.0.0.1")
+    SUPERVISOR_WORKER_BASE_PORT = int(os.getenv("SUPERVISOR_WORKER_BASE_PORT", "8081"))
+    SUPERVISOR_HEALTH_INTERVAL = float(os.getenv("SUPERVISOR_HEALTH_INTERVAL", "5"))
+    SUPERVISOR_HEALTH_FAILURES = int(os.getenv("SUPERVISOR_HEALTH_FAILURES", "3"))
+    SUPERVISOR_FORWARD_TIMEOUT = float(os.getenv("SUPERVISOR_FORWARD_TIMEOUT", "30"))
+
+    # Логирование; AI_DEBUG_SAMPLE_RATE — доля ходов, для которых пишется полный промпт
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    AI_DEBUG_SAMPLE_RATE = float(os.getenv("AI_DEBUG_SAMPLE_RATE", "0"))
+
+    # Пул потоков для подсчёта токенов; тексты короче TOKENIZER_INLINE_CHARS считаются сразу
+    TOKENIZER_THREADS = int(os.getenv("TOKENIZER_THREADS", "4"))
+    TOKENIZER_INLINE_CHARS = int(os.getenv("TOKENIZER_INLINE_CHARS", "2000"))
+
+    # Бюджеты контекста по уровню подписки
+    CONTEXT_BLOCK_MESSAGES = int(os.getenv("CONTEXT_BLOCK_MESSAGES", "8"))
+    CONTEXT_FREE_HISTORY_TOKENS = int(os.getenv("CONTEXT_FREE_HISTORY_TOKENS", "1024"))
+    CONTEXT_FREE_HISTORY_MESSAGES = int(os.getenv("CONTEXT_FREE_HISTORY_MESSAGES", "15"))
+    CONTEXT_FREE_FETCH_MESSAGES = int(os.getenv("CONTEXT_FREE_FETCH_MESSAGES", "20"))
+    CONTEXT_FREE_MAX_COMPLETION_TOKENS = int(os.getenv("CONTEXT_FREE_MAX_COMPLETION_TOKENS", "2048"))
+    CONTEXT_PREMIUM_HISTORY_TOKENS = int(os.getenv("CONTEXT_PREMIUM_HISTORY_TOKENS", "4096"))
+    CONTEXT_PREMIUM_HISTORY_MESSAGES = int(os.getenv("CONTEXT_PREMIUM_HISTORY_MESSAGES", "40"))
+    CONTEXT_PREMIUM_FETCH_MESSAGES = int(os.getenv("CONTEXT_PREMIUM_FETCH_MESSAGES", "50"))
+    CONTEXT_PREMIUM_MAX_COMPLETION_TOKENS = int(os.getenv("CONTEXT_PREMIUM_MAX_COMPLETION_TOKENS", "4096"))
+
+    # Фоновое сжатие старой части диалогов в резюме
+    SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+    SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL", "60"))
+    SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "1024"))
+    SUMMARY_KEEP_RECENT = int(os.getenv("SUMMARY_KEEP_RECENT", "6"))
+    SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "400"))
+    SUMMARY_BATCH_TOKENS = int(os.getenv("SUMMARY_BATCH_TOKENS", "6000"))
+    SUMMARY_BATCH_DIALOGUES = int(os.getenv("SUMMARY_BATCH_DIALOGUES", "50"))
+    SUMMARY_ACTIVE_WINDOW = float(os.getenv("SUMMARY_ACTIVE_WINDOW", "86400"))
+
     if not TELEGRAM_BOT_TOKEN:
         raise ValueError("Ошибка: TELEGRAM_BOT_TOKEN не найден в .env файле!")
     if not DEEPSEEK_API_KEY:
@@ -27,6 +140,12 @@ class Config:
         raise ValueError("<Ошибка>: YUKASSA_SHOP_ID не найден в .env файле!")
     if not YUKASSA_SECRET_KEY:
         raise ValueError("<Ошибка>: YUKASSA_SECRET_KEY не найден в .env файле!")
+    if BOT_MODE not in ("polling", "webhook"):
+        raise ValueError("<Ошибка>: BOT_MODE должен быть polling или webhook!")
+    if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+        raise ValueError("<Ошибка>: WEBHOOK_SECRET не найден в .env файле!")
+    if BOT_MODE == "webhook" and WEBHOOK_SET_ON_STARTUP and not WEBHOOK_BASE_URL:
+        raise ValueError("<Ошибка>: WEBHOOK_BASE_URL не найден в .env файле!")
 
 
 
@@ -1,8 +1,10 @@
 from typing import Optional, List, Dict, Tuple
+from datetime import datetime
 import logging
 
+from src.ai.tokenizer import count_tokens_async, count_tokens_batch_async
 from src.database.CRUDs.context_manager import get_db
-from src.database.CRUDs.dialogue.dialogue_dto import DialogueResponseDTO
+from src.database.CRUDs.dialogue.dialogue_dto import DialogueResponseDTO, MessageDTO
 from src.database.CRUDs.dialogue.sqlalchemy_dialogue_repository import SQLAlchemyDialogueRepository
 from src.database.CRUDs.dialogue.dialogue_service import DialogueService
 
@@ -17,6 +19,13 @@ class AsyncDialogueService:
             telegram_id: int,
             initial_history: Optional[List[Dict]] = None
     ) -> Tuple[DialogueResponseDTO, bool]:
+        if initial_history:
+            # Токены считаются до открытия транзакции, как и в add_message
+            counts = await count_tokens_batch_async([message["content"] for message in initial_history])
+            initial_history = [
+                {**message, "token_count": token_count}
+                for message, token_count in zip(initial_history, counts)
+            ]
         async with get_db() as session:
             repo = SQLAlchemyDialogueRepository(session)
             service = DialogueService(repo)
@@ -29,11 +38,12 @@ class AsyncDialogueService:
             role: str,
             content: str,
             metadata: Optional[Dict] = None
-    ) -> DialogueResponseDTO:
+    ) -> MessageDTO:
+        token_count = await count_tokens_async(content)
         async with get_db() as session:
             repo = SQLAlchemyDialogueRepository(session)
             service = DialogueService(repo)
-            return await service.add_message(telegram_id, role, content, metadata)
+            return await service.add_message(telegram_id, role, content, token_count, metadata)
 
     @classmethod
     async def get_conversation_history(
@@ -52,7 +62,7 @@ class AsyncDialogueService:
             telegram_id: int,
             content: str,
             metadata: Optional[Dict] = None
-    ) -> DialogueResponseDTO:
+    ) -> MessageDTO:
         return await cls.add_message(
             telegram_id=telegram_id,
             role="user",
@@ -66,7 +76,7 @@ class AsyncDialogueService:
             telegram_id: int,
             content: str,
             metadata: Optional[Dict] = None
-    ) -> DialogueResponseDTO:
+    ) -> MessageDTO:
         return await cls.add_message(
             telegram_id=telegram_id,
             role="assistant",
@@ -80,8 +90,7 @@ class AsyncDialogueService:
             telegram_id: int,
             last_n: int = 10
     ) -> List[Dict]:
-        history = await cls.get_conversation_history(telegram_id)
-        return history[-last_n:] if history else []
+        return await cls.get_conversation_history(telegram_id, limit=last_n)
 
     @classmethod
     async def clear_conversation_history(
@@ -91,6 +100,43 @@ class AsyncDialogueService:
         async with get_db() as session:
             repo = SQLAlchemyDialogueRepository(session)
             dialogue, created = await repo.get_or_create_dialogue(telegram_id)
-            dialogue.conversation_history = []
-            await session.flush()
-            return DialogueResponseDTO.from_orm(dialogue)
\ No newline at end of file
+            await repo.clear_messages(dialogue.id)
+            return DialogueResponseDTO.from_orm(dialogue)
+
+    @classmethod
+    async def get_dialogues_to_summarize(
+            cls,
+            min_tokens: int,
+            active_since: datetime,
+            keep_recent: int,
+            limit: int
+    ) -> List[int]:
+        async with get_db() as session:
+            repo = SQLAlchemyDialogueRepository(session)
+            service = DialogueService(repo)
+            return await service.get_dialogues_to_summarize(min_tokens, active_since, keep_recent, limit)
+
+    @classmethod
+    async def get_unsummarized_messages(
+            cls,
+            dialogue_id: int,
+            keep_recent: int,
+            max_tokens: int
+    ) -> Tuple[Optional[DialogueResponseDTO], List[MessageDTO]]:
+        async with get_db() as session:
+            repo = SQLAlchemyDialogueRepository(session)
+            service = DialogueService(repo)
+            return await service.get_unsummarized_messages(dialogue_id, keep_recent, max_tokens)
+
+    @classmethod
+    async def save_summary(
+            cls,
+            dialogue_id: int,
+            summary: str,
+            token_count: int,
+            summary_seq: int
+    ) -> bool:
+        async with get_db() as session:
+            repo = SQLAlchemyDialogueRepository(session)
+            service = DialogueService(repo)
+            return await service.save_summary(dialogue_id, summary, token_count, summary_seq)
@@ -8,6 +8,32 @@ class MessageDTO:
     content: str
     metadata: Optional[Dict] = None
     timestamp: Optional[str] = None
+    token_count: Optional[int] = None
+    seq: Optional[int] = None
+
+    @classmethod
+    def from_orm(cls, message: 'Message') -> 'MessageDTO':
+        return cls(
+            role=message.role,
+            content=message.content,
+            metadata=message.metadata_,
+            timestamp=message.timestamp.isoformat() if message.timestamp else None,
+            token_count=message.token_count,
+            seq=message.seq
+        )
+
+    def to_dict(self) -> Dict:
+        """Формат элемента истории, который ожидает prompt_manager"""
+        message = {
+            "role": self.role,
+            "content": self.content,
+            "token_count": self.token_count,
+            "seq": self.seq,
+            "timestamp": self.timestamp
+        }
+        if self.metadata:
+            message["metadata"] = self.metadata
+        return message
 
 @dataclass
 class DialogueCreateDTO:
@@ -18,16 +44,20 @@ class DialogueCreateDTO:
 class DialogueResponseDTO:
     id: int
     user_id: int
-    conversation_history: List[Dict]
     updated_at: datetime
     created_at: datetime
+    summary: Optional[str] = None
+    summary_token_count: int = 0
+    summary_seq: int = 0
 
     @classmethod
     def from_orm(cls, dialogue: 'Dialogue') -> 'DialogueResponseDTO':
         return cls(
             id=dialogue.id,
             user_id=dialogue.user_id,
-            conversation_history=dialogue.conversation_history or [],
             updated_at=dialogue.updated_at,
-            created_at=dialogue.created_at
-        )
\ No newline at end of file
+            created_at=dialogue.created_at,
+            summary=dialogue.summary,
+            summary_token_count=dialogue.summary_token_count or 0,
+            summary_seq=dialogue.summary_seq or 0
+        )
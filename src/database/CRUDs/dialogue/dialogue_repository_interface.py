@@ -1,10 +1,15 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Optional, List, Dict, Tuple
-from src.database.models import Dialogue
+from src.database.models import User, Dialogue, Message
 
 
 class IDialogueRepository(ABC):
 
+    @abstractmethod
+    async def get_user_and_dialogue(self, telegram_id: int) -> Tuple[User, Dialogue, bool]:
+        pass
+
     @abstractmethod
     async def get_or_create_dialogue(
             self,
@@ -19,8 +24,33 @@ class IDialogueRepository(ABC):
             telegram_id: int,
             role: str,
             content: str,
+            token_count: int,
             metadata: Optional[Dict] = None
-    ) -> Dialogue:
+    ) -> Message:
+        pass
+
+    @abstractmethod
+    async def append_message(
+            self,
+            dialogue_id: int,
+            role: str,
+            content: str,
+            token_count: int,
+            metadata: Optional[Dict] = None
+    ) -> Message:
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, dialogue_id: int) -> Optional[Dialogue]:
+        pass
+
+    @abstractmethod
+    async def get_last_messages(
+            self,
+            dialogue_id: int,
+            limit: Optional[int] = None,
+            after_seq: int = 0
+    ) -> List[Message]:
         pass
 
     @abstractmethod
@@ -31,6 +61,40 @@ class IDialogueRepository(ABC):
     ) -> List[Dict]:
         pass
 
+    @abstractmethod
+    async def clear_messages(self, dialogue_id: int) -> int:
+        pass
+
+    @abstractmethod
+    async def get_messages_to_summarize(
+            self,
+            dialogue_id: int,
+            after_seq: int,
+            keep_recent: int,
+            max_tokens: int
+    ) -> List[Message]:
+        pass
+
+    @abstractmethod
+    async def get_dialogues_to_summarize(
+            self,
+            min_tokens: int,
+            active_since: datetime,
+            keep_recent: int,
+            limit: int
+    ) -> List[int]:
+        pass
+
+    @abstractmethod
+    async def update_summary(
+            self,
+            dialogue_id: int,
+            summary: str,
+            token_count: int,
+            summary_seq: int
+    ) -> bool:
+        pass
+
     @abstractmethod
     async def refresh_dialogue(self, dialogue: Dialogue) -> Dialogue:
-        pass
\ No newline at end of file
+        pass
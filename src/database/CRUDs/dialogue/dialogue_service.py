@@ -1,7 +1,8 @@
 from typing import Optional, List, Dict, Tuple
+from datetime import datetime
 import logging
 
-from src.database.CRUDs.dialogue.dialogue_dto import DialogueResponseDTO
+from src.database.CRUDs.dialogue.dialogue_dto import DialogueResponseDTO, MessageDTO
 from src.database.CRUDs.dialogue.dialogue_repository_interface import IDialogueRepository
 
 logger = logging.getLogger(__name__)
@@ -27,15 +28,17 @@ class DialogueService:
             telegram_id: int,
             role: str,
             content: str,
+            token_count: int,
             metadata: Optional[Dict] = None
-    ) -> DialogueResponseDTO:
-        dialogue = await self._dialogue_repo.add_message(
+    ) -> MessageDTO:
+        message = await self._dialogue_repo.add_message(
             telegram_id=telegram_id,
             role=role,
             content=content,
+            token_count=token_count,
             metadata=metadata
         )
-        return DialogueResponseDTO.from_orm(dialogue)
+        return MessageDTO.from_orm(message)
 
     async def get_conversation_history(
             self,
@@ -45,4 +48,50 @@ class DialogueService:
         return await self._dialogue_repo.get_conversation_history(
             telegram_id=telegram_id,
             limit=limit
-        )
\ No newline at end of file
+        )
+
+    async def get_dialogues_to_summarize(
+            self,
+            min_tokens: int,
+            active_since: datetime,
+            keep_recent: int,
+            limit: int
+    ) -> List[int]:
+        return await self._dialogue_repo.get_dialogues_to_summarize(
+            min_tokens=min_tokens,
+            active_since=active_since,
+            keep_recent=keep_recent,
+            limit=limit
+        )
+
+    async def get_unsummarized_messages(
+            self,
+            dialogue_id: int,
+            keep_recent: int,
+            max_tokens: int
+    ) -> Tuple[Optional[DialogueResponseDTO], List[MessageDTO]]:
+        dialogue = await self._dialogue_repo.get_by_id(dialogue_id)
+        if not dialogue:
+            return None, []
+
+        messages = await self._dialogue_repo.get_messages_to_summarize(
+            dialogue_id,
+            after_seq=dialogue.summary_seq or 0,
+            keep_recent=keep_recent,
+            max_tokens=max_tokens
+        )
+        return DialogueResponseDTO.from_orm(dialogue), [MessageDTO.from_orm(message) for message in messages]
+
+    async def save_summary(
+            self,
+            dialogue_id: int,
+            summary: str,
+            token_count: int,
+            summary_seq: int
+    ) -> bool:
+        return await self._dialogue_repo.update_summary(
+            dialogue_id=dialogue_id,
+            summary=summary,
+            token_count=token_count,
+            summary_seq=summary_seq
+        )
@@ -1,9 +1,11 @@
 from typing import Optional, List, Dict, Tuple
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from src.database.models import User, Dialogue
+from src.database.models import User, Dialogue, Message
+from src.database.CRUDs.dialogue.dialogue_dto import MessageDTO
 from src.database.CRUDs.dialogue.dialogue_repository_interface import IDialogueRepository
 
 
@@ -11,74 +13,242 @@ class SQLAlchemyDialogueRepository(IDialogueRepository):
     def __init__(self, session: AsyncSession):
         self._session = session
 
-    async def get_or_create_dialogue(
-            self,
-            telegram_id: int,
-            initial_history: Optional[List[Dict]] = None
-    ) -> Tuple[Dialogue, bool]:
-        user = await self._session.scalar(
-            select(User).where(User.telegram_id == telegram_id)
-        )
+    async def get_user_and_dialogue(self, telegram_id: int) -> Tuple[User, Dialogue, bool]:
+        row = (await self._session.execute(
+            select(User, Dialogue)
+            .outerjoin(Dialogue, Dialogue.user_id == User.id)
+            .where(User.telegram_id == telegram_id)
+        )).first()
 
-        if not user:
+        if not row:
             raise ValueError(
                 f"Пользователь с telegram_id={telegram_id} не найден. "
                 "Сначала зарегистрируйтесь через /start"
             )
 
-        existing_dialogue = await self._session.scalar(
-            select(Dialogue).where(Dialogue.user_id == user.id)
-        )
+        user, dialogue = row
+        if dialogue:
+            return user, dialogue, False
 
-        if existing_dialogue:
-            return existing_dialogue, False
-        else:
-            new_dialogue = Dialogue(
-                user_id=user.id,
-                conversation_history=initial_history or []
-            )
-            self._session.add(new_dialogue)
-            await self._session.flush()
-            return new_dialogue, True
+        new_dialogue = Dialogue(user_id=user.id)
+        self._session.add(new_dialogue)
+        await self._session.flush()
+        return user, new_dialogue, True
+
+    async def get_or_create_dialogue(
+            self,
+            telegram_id: int,
+            initial_history: Optional[List[Dict]] = None
+    ) -> Tuple[Dialogue, bool]:
+        user, dialogue, created = await self.get_user_and_dialogue(telegram_id)
+
+        if created:
+            for message in initial_history or []:
+                await self.append_message(
+                    dialogue_id=dialogue.id,
+                    role=message["role"],
+                    content=message["content"],
+                    token_count=message["token_count"],
+                    metadata=message.get("metadata")
+                )
+        return dialogue, created
 
     async def add_message(
             self,
             telegram_id: int,
             role: str,
             content: str,
+            token_count: int,
             metadata: Optional[Dict] = None
-    ) -> Dialogue:
+    ) -> Message:
         dialogue, created = await self.get_or_create_dialogue(telegram_id)
+        return await self.append_message(
+            dialogue_id=dialogue.id,
+            role=role,
+            content=content,
+            token_count=token_count,
+            metadata=metadata
+        )
 
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+    async def append_message(
+            self,
+            dialogue_id: int,
+            role: str,
+            content: str,
+            token_count: int,
+            metadata: Optional[Dict] = None
+    ) -> Message:
+        # Один INSERT: следующий seq берётся по индексу (dialogue_id, seq)
+        next_seq = (
+            select(func.coalesce(func.max(Message.seq), 0) + 1)
+            .where(Message.dialogue_id == dialogue_id)
+            .scalar_subquery()
+        )
+        message = await self._session.scalar(
+            insert(Message)
+            .values(
+                dialogue_id=dialogue_id,
+                seq=next_seq,
+                role=role,
+                content=content,
+                token_count=token_count,
+                metadata_=metadata
+            )
+            .returning(Message)
+        )
+        # updated_at — признак активности диалога для фонового сжатия (индексирован)
+        await self._session.execute(
+            update(Dialogue)
+            .where(Dialogue.id == dialogue_id)
+            .values(updated_at=func.now())
+        )
+        return message
 
-        if metadata:
-            message["metadata"] = metadata
+    async def get_by_id(self, dialogue_id: int) -> Optional[Dialogue]:
+        return await self._session.get(Dialogue, dialogue_id)
 
-        current_history = dialogue.conversation_history.copy() if dialogue.conversation_history else []
-        current_history.append(message)
-        dialogue.conversation_history = current_history
-        dialogue.updated_at = datetime.utcnow()
-        await self._session.flush()
+    async def get_last_messages(
+            self,
+            dialogue_id: int,
+            limit: Optional[int] = None,
+            after_seq: int = 0
+    ) -> List[Message]:
+        stmt = (
+            select(Message)
+            .where(
+                Message.dialogue_id == dialogue_id,
+                Message.seq > after_seq
+            )
+            .order_by(Message.seq.desc())
+        )
+        if limit:
+            stmt = stmt.limit(limit)
 
-        return dialogue
+        messages = (await self._session.scalars(stmt)).all()
+        return list(reversed(messages))
 
     async def get_conversation_history(
             self,
             telegram_id: int,
             limit: Optional[int] = None
     ) -> List[Dict]:
-        dialogue, created = await self.get_or_create_dialogue(telegram_id)
+        # Один запрос: users -> dialogues -> messages, хвост отбирается на стороне БД
+        stmt = (
+            select(Message)
+            .join(Dialogue, Message.dialogue_id == Dialogue.id)
+            .join(User, Dialogue.user_id == User.id)
+            .where(User.telegram_id == telegram_id)
+            .order_by(Message.seq.desc())
+        )
+        if limit:
+            stmt = stmt.limit(limit)
 
-        if limit and len(dialogue.conversation_history) > limit:
-            return dialogue.conversation_history[-limit:]
+        messages = (await self._session.scalars(stmt)).all()
+        return [MessageDTO.from_orm(message).to_dict() for message in reversed(messages)]
 
-        return dialogue.conversation_history or []
+    async def clear_messages(self, dialogue_id: int) -> int:
+        result = await self._session.execute(
+            delete(Message)
+            .where(Message.dialogue_id == dialogue_id)
+            .returning(Message.id)
+        )
+        # Нумерация seq начнётся заново — резюме старой истории больше не относится к диалогу
+        await self._session.execute(
+            update(Dialogue)
+            .where(Dialogue.id == dialogue_id)
+            .values(summary=None, summary_token_count=0, summary_seq=0)
+        )
+        return len(result.all())
+
+    async def get_messages_to_summarize(
+            self,
+            dialogue_id: int,
+            after_seq: int,
+            keep_recent: int,
+            max_tokens: int
+    ) -> List[Message]:
+        last = aliased(Message)
+        last_seq = (
+            select(func.max(last.seq))
+            .where(last.dialogue_id == dialogue_id)
+            .scalar_subquery()
+        )
+        # Сколько токенов набрано до сообщения: читаем только то, что войдёт в один проход
+        preceding = (
+            func.sum(Message.token_count).over(order_by=Message.seq) - Message.token_count
+        ).label("preceding")
+        candidates = (
+            select(Message.id, preceding)
+            .where(
+                Message.dialogue_id == dialogue_id,
+                Message.seq > after_seq,
+                Message.seq <= last_seq - keep_recent
+            )
+            .subquery()
+        )
+        stmt = (
+            select(Message)
+            .join(candidates, candidates.c.id == Message.id)
+            .where(candidates.c.preceding < max_tokens)
+            .order_by(Message.seq)
+        )
+        return list((await self._session.scalars(stmt)).all())
+
+    async def get_dialogues_to_summarize(
+            self,
+            min_tokens: int,
+            active_since: datetime,
+            keep_recent: int,
+            limit: int
+    ) -> List[int]:
+        # Последние keep_recent сообщений не сжимаются и в порог не входят
+        last = aliased(Message)
+        last_seq = (
+            select(func.max(last.seq))
+            .where(last.dialogue_id == Dialogue.id)
+            .correlate(Dialogue)
+            .scalar_subquery()
+        )
+        # Только недавно активные диалоги (индекс по updated_at), без скана всей таблицы messages
+        stmt = (
+            select(Dialogue.id)
+            .join(Message, Message.dialogue_id == Dialogue.id)
+            .where(
+                Dialogue.updated_at >= active_since,
+                Message.seq > Dialogue.summary_seq,
+                Message.seq <= last_seq - keep_recent
+            )
+            .group_by(Dialogue.id)
+            .having(func.sum(Message.token_count) > min_tokens)
+            .limit(limit)
+        )
+        return list((await self._session.scalars(stmt)).all())
+
+    async def update_summary(
+            self,
+            dialogue_id: int,
+            summary: str,
+            token_count: int,
+            summary_seq: int
+    ) -> bool:
+        # Условие на summary_seq не даёт устаревшему резюме затереть более новое
+        result = await self._session.execute(
+            update(Dialogue)
+            .where(
+                Dialogue.id == dialogue_id,
+                Dialogue.summary_seq < summary_seq
+            )
+            .values(
+                summary=summary,
+                summary_token_count=token_count,
+                summary_seq=summary_seq,
+                # Сжатие — не активность пользователя, updated_at не трогаем
+                updated_at=Dialogue.updated_at
+            )
+            .returning(Dialogue.id)
+        )
+        return result.first() is not None
 
     async def refresh_dialogue(self, dialogue: Dialogue) -> Dialogue:
         await self._session.refresh(dialogue)
-        return dialogue
\ No newline at end of file
+        return dialogue
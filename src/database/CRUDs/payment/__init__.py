@@ -0,0 +1,13 @@
+from src.database.CRUDs.payment.async_payment_service import AsyncPaymentService
+from src.database.CRUDs.payment.payment_dto import (
+    PaymentStatus,
+    PaymentCreateDTO,
+    PaymentResponseDTO
+)
+
+__all__ = [
+    'AsyncPaymentService',
+    'PaymentStatus',
+    'PaymentCreateDTO',
+    'PaymentResponseDTO',
+]
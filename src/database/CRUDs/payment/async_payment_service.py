@@ -0,0 +1,73 @@
+from typing import Optional, List
+from datetime import datetime
+import logging
+
+from src.database.CRUDs.context_manager import get_db
+from src.database.CRUDs.quota_cache import quota_cache
+from src.database.CRUDs.payment.payment_dto import PaymentCreateDTO, PaymentResponseDTO, PaymentStatus
+from src.database.CRUDs.payment.sqlalchemy_payment_repository import SQLAlchemyPaymentRepository
+from src.database.CRUDs.payment.payment_service import PaymentService
+from src.database.CRUDs.subscription.sqlalchemy_subscription_repository import SQLAlchemySubscriptionRepository
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPaymentService:
+
+    @classmethod
+    async def register_payment(cls, payment_data: PaymentCreateDTO) -> PaymentResponseDTO:
+        async with get_db() as session:
+            service = PaymentService(
+                SQLAlchemyPaymentRepository(session),
+                SQLAlchemySubscriptionRepository(session)
+            )
+            return await service.register_payment(payment_data)
+
+    @classmethod
+    async def get_payment(cls, payment_id: str) -> Optional[PaymentResponseDTO]:
+        async with get_db() as session:
+            service = PaymentService(
+                SQLAlchemyPaymentRepository(session),
+                SQLAlchemySubscriptionRepository(session)
+            )
+            return await service.get_payment(payment_id)
+
+    @classmethod
+    async def get_due_payments(cls, now: datetime, limit: int) -> List[PaymentResponseDTO]:
+        async with get_db() as session:
+            service = PaymentService(
+                SQLAlchemyPaymentRepository(session),
+                SQLAlchemySubscriptionRepository(session)
+            )
+            return await service.get_due_payments(now, limit)
+
+    @classmethod
+    async def complete_payment(cls, payment_id: str) -> Optional[PaymentResponseDTO]:
+        async with get_db() as session:
+            service = PaymentService(
+                SQLAlchemyPaymentRepository(session),
+                SQLAlchemySubscriptionRepository(session)
+            )
+            payment = await service.complete_payment(payment_id)
+        if payment:
+            # Тип подписки и лимит изменились — перечитаем при следующем обращении
+            quota_cache.invalidate(payment.telegram_id)
+        return payment
+
+    @classmethod
+    async def close_payment(cls, payment_id: str, status: PaymentStatus) -> bool:
+        async with get_db() as session:
+            service = PaymentService(
+                SQLAlchemyPaymentRepository(session),
+                SQLAlchemySubscriptionRepository(session)
+            )
+            return await service.close_payment(payment_id, status)
+
+    @classmethod
+    async def schedule_check(cls, payment_id: str, next_check_at: datetime) -> None:
+        async with get_db() as session:
+            service = PaymentService(
+                SQLAlchemyPaymentRepository(session),
+                SQLAlchemySubscriptionRepository(session)
+            )
+            await service.schedule_check(payment_id, next_check_at)
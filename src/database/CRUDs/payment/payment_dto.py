@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+
+class PaymentStatus(str, Enum):
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    CANCELED = "canceled"
+    EXPIRED = "expired"
+
+@dataclass
+class PaymentCreateDTO:
+    payment_id: str
+    telegram_id: int
+    amount: float
+    days: int
+    next_check_at: Optional[datetime] = None
+
+@dataclass
+class PaymentResponseDTO:
+    id: int
+    payment_id: str
+    telegram_id: int
+    amount: float
+    days: int
+    status: str
+    created_at: datetime
+    checked_at: Optional[datetime]
+    next_check_at: datetime
+
+    @classmethod
+    def from_orm(cls, payment: 'Payment') -> 'PaymentResponseDTO':
+        return cls(
+            id=payment.id,
+            payment_id=payment.payment_id,
+            telegram_id=payment.telegram_id,
+            amount=float(payment.amount),
+            days=payment.days,
+            status=payment.status,
+            created_at=payment.created_at,
+            checked_at=payment.checked_at,
+            next_check_at=payment.next_check_at
+        )
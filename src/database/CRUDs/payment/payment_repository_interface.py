@@ -0,0 +1,33 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, List
+
+from src.database.models import Payment
+from src.database.CRUDs.payment.payment_dto import PaymentCreateDTO, PaymentStatus
+
+
+class IPaymentRepository(ABC):
+    @abstractmethod
+    async def create_payment(self, payment_data: PaymentCreateDTO) -> Payment:
+        pass
+
+    @abstractmethod
+    async def get_by_payment_id(self, payment_id: str) -> Optional[Payment]:
+        pass
+
+    @abstractmethod
+    async def get_due_payments(self, now: datetime, limit: int) -> List[Payment]:
+        pass
+
+    @abstractmethod
+    async def update_status(
+            self,
+            payment_id: str,
+            status: PaymentStatus,
+            from_status: PaymentStatus = PaymentStatus.PENDING
+    ) -> Optional[Payment]:
+        pass
+
+    @abstractmethod
+    async def schedule_check(self, payment_id: str, next_check_at: datetime) -> None:
+        pass
@@ -0,0 +1,57 @@
+from typing import Optional, List
+from datetime import datetime
+import logging
+
+from src.database.CRUDs.payment.payment_dto import PaymentCreateDTO, PaymentResponseDTO, PaymentStatus
+from src.database.CRUDs.payment.payment_repository_interface import IPaymentRepository
+from src.database.CRUDs.subscription.subscription_dto import SubscriptionCreateDTO, SubscriptionType
+from src.database.CRUDs.subscription.subscription_repository_interface import ISubscriptionRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentService:
+    def __init__(self, payment_repository: IPaymentRepository, subscription_repository: ISubscriptionRepository):
+        self._payment_repo = payment_repository
+        self._subscription_repo = subscription_repository
+
+    async def register_payment(self, payment_data: PaymentCreateDTO) -> PaymentResponseDTO:
+        payment = await self._payment_repo.create_payment(payment_data)
+        return PaymentResponseDTO.from_orm(payment)
+
+    async def get_payment(self, payment_id: str) -> Optional[PaymentResponseDTO]:
+        payment = await self._payment_repo.get_by_payment_id(payment_id)
+        if payment:
+            return PaymentResponseDTO.from_orm(payment)
+        return None
+
+    async def get_due_payments(self, now: datetime, limit: int) -> List[PaymentResponseDTO]:
+        payments = await self._payment_repo.get_due_payments(now, limit)
+        return [PaymentResponseDTO.from_orm(payment) for payment in payments]
+
+    async def complete_payment(self, payment_id: str) -> Optional[PaymentResponseDTO]:
+        """
+        Переводит платёж в succeeded и выдаёт premium-подписку в одной транзакции.
+
+        Returns:
+            Платёж, если он подтверждён этим вызовом; None, если уже обработан
+        """
+        payment = await self._payment_repo.update_status(payment_id, PaymentStatus.SUCCEEDED)
+        if not payment:
+            return None
+
+        subscription = await self._subscription_repo.create_subscription(SubscriptionCreateDTO(
+            telegram_id=payment.telegram_id,
+            subscription_type=SubscriptionType.PREMIUM,
+            days=payment.days
+        ))
+        if not subscription:
+            # Откат транзакции вернёт платёж в pending — сверка повторит попытку
+            raise RuntimeError(f"Failed to grant subscription for payment {payment_id}")
+        return PaymentResponseDTO.from_orm(payment)
+
+    async def close_payment(self, payment_id: str, status: PaymentStatus) -> bool:
+        return await self._payment_repo.update_status(payment_id, status) is not None
+
+    async def schedule_check(self, payment_id: str, next_check_at: datetime) -> None:
+        await self._payment_repo.schedule_check(payment_id, next_check_at)
@@ -0,0 +1,76 @@
+from typing import Optional, List
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+
+from src.database.models import Payment
+from src.database.CRUDs.payment.payment_dto import PaymentCreateDTO, PaymentStatus
+from src.database.CRUDs.payment.payment_repository_interface import IPaymentRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SQLAlchemyPaymentRepository(IPaymentRepository):
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def create_payment(self, payment_data: PaymentCreateDTO) -> Payment:
+        now = datetime.utcnow()
+        # Повторная регистрация того же платежа (например, из уведомления) ничего не меняет
+        await self._session.execute(
+            insert(Payment)
+            .values(
+                payment_id=payment_data.payment_id,
+                telegram_id=payment_data.telegram_id,
+                amount=payment_data.amount,
+                days=payment_data.days,
+                status=PaymentStatus.PENDING.value,
+                created_at=now,
+                next_check_at=payment_data.next_check_at or now
+            )
+            .on_conflict_do_nothing(index_elements=[Payment.payment_id])
+        )
+        return await self.get_by_payment_id(payment_data.payment_id)
+
+    async def get_by_payment_id(self, payment_id: str) -> Optional[Payment]:
+        return await self._session.scalar(
+            select(Payment).where(Payment.payment_id == payment_id)
+        )
+
+    async def get_due_payments(self, now: datetime, limit: int) -> List[Payment]:
+        stmt = (
+            select(Payment)
+            .where(
+                Payment.status == PaymentStatus.PENDING.value,
+                Payment.next_check_at <= now
+            )
+            .order_by(Payment.next_check_at)
+            .limit(limit)
+        )
+        return list((await self._session.scalars(stmt)).all())
+
+    async def update_status(
+            self,
+            payment_id: str,
+            status: PaymentStatus,
+            from_status: PaymentStatus = PaymentStatus.PENDING
+    ) -> Optional[Payment]:
+        # Условный переход: из двух одновременных подтверждений пройдёт только одно
+        return await self._session.scalar(
+            update(Payment)
+            .where(
+                Payment.payment_id == payment_id,
+                Payment.status == from_status.value
+            )
+            .values(status=status.value, checked_at=datetime.utcnow())
+            .returning(Payment)
+        )
+
+    async def schedule_check(self, payment_id: str, next_check_at: datetime) -> None:
+        await self._session.execute(
+            update(Payment)
+            .where(Payment.payment_id == payment_id)
+            .values(checked_at=datetime.utcnow(), next_check_at=next_check_at)
+        )
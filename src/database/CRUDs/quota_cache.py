@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+import time
+
+from src.config import _Config
+
+
+@dataclass(frozen=True)
+class QuotaState:
+    daily_token_limit: int
+    tokens_used_today: int
+    subscription_type: Optional[str] = None  # None — бесплатный тариф
+
+    @property
+    def can_chat(self) -> bool:
+        return self.tokens_used_today < self.daily_token_limit
+
+    @property
+    def remaining(self) -> int:
+        return max(self.daily_token_limit - self.tokens_used_today, 0)
+
+
+class QuotaCache:
+    """
+    LRU-кэш состояния квоты пользователей с TTL, ключ — telegram_id.
+
+    Кэш живёт в памяти процесса, поэтому все изменения квоты в этом процессе
+    должны проходить через него (write-through), а TTL ограничивает
+    устаревание при изменениях извне.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, QuotaState]]" = OrderedDict()
+
+    def get(self, telegram_id: int) -> Optional[QuotaState]:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return None
+
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            del self._entries[telegram_id]
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        return state
+
+    def set(self, telegram_id: int, state: QuotaState) -> None:
+        self._entries[telegram_id] = (time.monotonic() + self._ttl, state)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def update(self, telegram_id: int, **changes) -> None:
+        """
+        Обновляет только уже закэшированного пользователя.
+
+        Срок жизни записи не продлевается: иначе у активного пользователя
+        она не истекала бы и смена тарифа извне не была бы замечена.
+        """
+        state = self.get(telegram_id)
+        if state is not None:
+            expires_at, _ = self._entries[telegram_id]
+            self._entries[telegram_id] = (expires_at, replace(state, **changes))
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
+
+    def reset_usage(self) -> None:
+        """Ежедневный сброс: обнуляет использованные токены без похода в БД."""
+        for telegram_id, (expires_at, state) in self._entries.items():
+            self._entries[telegram_id] = (expires_at, replace(state, tokens_used_today=0))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+quota_cache = QuotaCache(maxsize=_Config.QUOTA_CACHE_SIZE, ttl=_Config.QUOTA_CACHE_TTL)
@@ -2,6 +2,7 @@ from typing import Optional
 import logging
 
 from src.database.CRUDs.context_manager import get_db
+from src.database.CRUDs.quota_cache import quota_cache
 from src.database.CRUDs.subscription.subscription_dto import (
     SubscriptionResponseDTO,
     SubscriptionType
@@ -29,11 +30,14 @@ class AsyncSubscriptionService:
         async with get_db() as session:
             repo = SQLAlchemySubscriptionRepository(session)
             service = SubscriptionService(repo)
-            return await service.create_or_extend_subscription(
+            subscription = await service.create_or_extend_subscription(
                 telegram_id=telegram_id,
                 subscription_type=sub_type,
                 days=days
             )
+        # Тип подписки и лимит изменились — перечитаем при следующем обращении
+        quota_cache.invalidate(telegram_id)
+        return subscription
 
     @classmethod
     async def get_active_subscription(cls, telegram_id: int) -> Optional[SubscriptionResponseDTO]:
@@ -61,7 +65,10 @@ class AsyncSubscriptionService:
         async with get_db() as session:
             repo = SQLAlchemySubscriptionRepository(session)
             service = SubscriptionService(repo)
-            return await service.expire_old_subscriptions()
+            expired_count = await service.expire_old_subscriptions()
+        if expired_count:
+            quota_cache.clear()
+        return expired_count
 
     @classmethod
     async def create_premium_subscription(cls, telegram_id: int, days: int = 30) -> Optional[SubscriptionResponseDTO]:
@@ -0,0 +1,7 @@
+from src.database.CRUDs.turn.async_turn_service import AsyncTurnService
+from src.database.CRUDs.turn.turn_dto import TurnContextDTO
+
+__all__ = [
+    'AsyncTurnService',
+    'TurnContextDTO',
+]
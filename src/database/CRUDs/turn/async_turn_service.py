@@ -0,0 +1,98 @@
+from typing import Optional, Dict
+import logging
+
+from src.ai.tokenizer import count_tokens_async
+from src.database.CRUDs.context_manager import get_db
+from src.database.CRUDs.quota_cache import quota_cache
+from src.database.CRUDs.dialogue.dialogue_dto import MessageDTO
+from src.database.CRUDs.dialogue.sqlalchemy_dialogue_repository import SQLAlchemyDialogueRepository
+from src.database.CRUDs.user.sqlalchemy_user_repository import SQLAlchemyUserRepository
+from src.database.CRUDs.turn.turn_dto import TurnContextDTO
+from src.database.CRUDs.turn.turn_service import TurnService
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTurnService:
+    """
+    Unit of work для одного хода диалога: вся работа с БД укладывается
+    в две короткие транзакции — до и после запроса к модели.
+    """
+
+    @classmethod
+    async def begin_turn(
+            cls,
+            telegram_id: int,
+            content: str,
+            reserve_tokens: int,
+            history_limit: Optional[int] = None
+    ) -> TurnContextDTO:
+        """
+        Резервирует reserve_tokens из дневного лимита. Если резерв не помещается,
+        возвращает контекст без резерва и не сохраняет сообщение.
+        """
+        # Токенизация до открытия транзакции: длинный текст не держит соединение
+        token_count = await count_tokens_async(content)
+        async with get_db() as session:
+            service = TurnService(
+                SQLAlchemyUserRepository(session),
+                SQLAlchemyDialogueRepository(session)
+            )
+            context = await service.begin_turn(
+                telegram_id,
+                content,
+                reserve_tokens,
+                token_count=token_count,
+                history_limit=history_limit
+            )
+        cls._update_quota_cache(context)
+        return context
+
+    @classmethod
+    async def finish_turn(
+            cls,
+            context: TurnContextDTO,
+            content: str,
+            tokens_used: int,
+            token_count: int,
+            metadata: Optional[Dict] = None
+    ) -> MessageDTO:
+        """
+        Args:
+            tokens_used: Фактический расход за ход, списывается вместо резерва
+            token_count: Длина ответа в токенах для истории
+            metadata: Метаданные сообщения ассистента
+        """
+        async with get_db() as session:
+            service = TurnService(
+                SQLAlchemyUserRepository(session),
+                SQLAlchemyDialogueRepository(session)
+            )
+            message = await service.finish_turn(context, content, tokens_used, token_count, metadata)
+        cls._update_quota_cache(context)
+        return message
+
+    @classmethod
+    async def release_turn(cls, context: TurnContextDTO) -> None:
+        """Возвращает резерв, если ответ от модели не получен."""
+        if not context.has_reservation:
+            return
+        async with get_db() as session:
+            service = TurnService(
+                SQLAlchemyUserRepository(session),
+                SQLAlchemyDialogueRepository(session)
+            )
+            await service.release_turn(context)
+        cls._update_quota_cache(context)
+
+    @staticmethod
+    def _update_quota_cache(context: TurnContextDTO) -> None:
+        changes = dict(
+            tokens_used_today=context.tokens_used_today,
+            daily_token_limit=context.daily_token_limit
+        )
+        # Оплату и истечение подписки обрабатывает другой воркер —
+        # свежий тариф из резерва исправляет кэш этого процесса
+        if context.subscription_checked:
+            changes["subscription_type"] = context.subscription_type
+        quota_cache.update(context.telegram_id, **changes)
@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class TurnContextDTO:
+    """Состояние пользователя, собранное в начале хода диалога"""
+    telegram_id: int
+    user_id: int
+    dialogue_id: int
+    tokens_used_today: int
+    daily_token_limit: int
+    reserved_tokens: int = 0
+    history: List[Dict] = field(default_factory=list)
+    summary: Optional[str] = None
+    summary_token_count: int = 0
+    summary_seq: int = 0
+    # Тариф из БД на момент резерва; subscription_checked=False — не перечитывался
+    subscription_type: Optional[str] = None
+    subscription_checked: bool = False
+
+    @property
+    def can_chat(self) -> bool:
+        return self.tokens_used_today < self.daily_token_limit
+
+    @property
+    def has_reservation(self) -> bool:
+        return self.reserved_tokens > 0
@@ -0,0 +1,87 @@
+from typing import Optional, Dict
+import logging
+
+from src.database.CRUDs.dialogue.dialogue_dto import MessageDTO
+from src.database.CRUDs.dialogue.dialogue_repository_interface import IDialogueRepository
+from src.database.CRUDs.user.user_repository_interface import IUserRepository
+from src.database.CRUDs.turn.turn_dto import TurnContextDTO
+
+logger = logging.getLogger(__name__)
+
+
+class TurnService:
+    def __init__(self, user_repository: IUserRepository, dialogue_repository: IDialogueRepository):
+        self._user_repo = user_repository
+        self._dialogue_repo = dialogue_repository
+
+    async def begin_turn(
+            self,
+            telegram_id: int,
+            content: str,
+            reserve_tokens: int,
+            token_count: int,
+            history_limit: Optional[int] = None
+    ) -> TurnContextDTO:
+        user, dialogue, created = await self._dialogue_repo.get_user_and_dialogue(telegram_id)
+        context = TurnContextDTO(
+            telegram_id=telegram_id,
+            user_id=user.id,
+            dialogue_id=dialogue.id,
+            tokens_used_today=user.tokens_used_today or 0,
+            daily_token_limit=user.daily_token_limit,
+            summary=dialogue.summary,
+            summary_token_count=dialogue.summary_token_count or 0,
+            summary_seq=dialogue.summary_seq or 0
+        )
+
+        balance = await self._user_repo.reserve_tokens(telegram_id, reserve_tokens)
+        if not balance:
+            return context
+        context.reserved_tokens = reserve_tokens
+        context.tokens_used_today = balance.tokens_used_today
+        context.subscription_type = balance.subscription_type
+        context.subscription_checked = True
+
+        await self._dialogue_repo.append_message(
+            dialogue_id=dialogue.id,
+            role="user",
+            content=content,
+            token_count=token_count
+        )
+        # Сообщения до summary_seq уже сжаты в резюме
+        messages = await self._dialogue_repo.get_last_messages(
+            dialogue.id,
+            history_limit,
+            after_seq=context.summary_seq
+        )
+        context.history = [MessageDTO.from_orm(message).to_dict() for message in messages]
+        return context
+
+    async def finish_turn(
+            self,
+            context: TurnContextDTO,
+            content: str,
+            tokens_used: int,
+            token_count: int,
+            metadata: Optional[Dict] = None
+    ) -> MessageDTO:
+        message = await self._dialogue_repo.append_message(
+            dialogue_id=context.dialogue_id,
+            role="assistant",
+            content=content,
+            token_count=token_count,
+            metadata=metadata
+        )
+        # Фиксируем фактический расход: резерв уже списан, доводим до реального
+        await self._settle(context, tokens_used - context.reserved_tokens)
+        return MessageDTO.from_orm(message)
+
+    async def release_turn(self, context: TurnContextDTO) -> None:
+        await self._settle(context, -context.reserved_tokens)
+
+    async def _settle(self, context: TurnContextDTO, delta: int) -> None:
+        context.reserved_tokens = 0
+        balance = await self._user_repo.add_tokens_used(context.telegram_id, delta)
+        if balance:
+            context.tokens_used_today = balance.tokens_used_today
+            context.daily_token_limit = balance.daily_token_limit
@@ -1,6 +1,6 @@
 from src.database.CRUDs.user.async_user_service import AsyncUserService
 from src.database.CRUDs.user.user_dto import (
-    UserCreateDTO, UserUpdateDTO, UserTokenUsageDTO, UserResponseDTO
+    UserCreateDTO, UserUpdateDTO, UserTokenUsageDTO, UserTokenBalanceDTO, UserResponseDTO
 )
 
 __all__ = [
@@ -8,5 +8,6 @@ __all__ = [
     'UserCreateDTO',
     'UserUpdateDTO',
     'UserTokenUsageDTO',
+    'UserTokenBalanceDTO',
     'UserResponseDTO',
 ]
\ No newline at end of file
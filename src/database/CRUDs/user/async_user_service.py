@@ -2,9 +2,11 @@ from typing import Optional
 import logging
 
 from src.database.CRUDs.context_manager import get_db
-from src.database.CRUDs.user.user_dto import UserResponseDTO
+from src.database.CRUDs.quota_cache import quota_cache, QuotaState
+from src.database.CRUDs.user.user_dto import UserResponseDTO, UserTokenBalanceDTO
 from src.database.CRUDs.user.sqlalchemy_user_repository import SQLAlchemyUserRepository
 from src.database.CRUDs.user.user_service import UserService
+from src.database.CRUDs.subscription.sqlalchemy_subscription_repository import SQLAlchemySubscriptionRepository
 
 logger = logging.getLogger(__name__)
 
@@ -40,17 +42,43 @@ class AsyncUserService:
             return None, False
 
     @classmethod
-    async def add_tokens_used(cls, telegram_id: int, tokens_used: int) -> bool:
+    async def add_tokens_used(cls, telegram_id: int, tokens_used: int) -> Optional[UserTokenBalanceDTO]:
         async with get_db() as session:
             repo = SQLAlchemyUserRepository(session)
-            return await repo.add_tokens_used(telegram_id, tokens_used)
+            balance = await repo.add_tokens_used(telegram_id, tokens_used)
+        if balance:
+            quota_cache.update(
+                telegram_id,
+                tokens_used_today=balance.tokens_used_today,
+                daily_token_limit=balance.daily_token_limit
+            )
+        return balance
+
+    @classmethod
+    async def get_quota_state(cls, telegram_id: int) -> Optional[QuotaState]:
+        """Состояние квоты из кэша; при промахе — из БД с записью в кэш."""
+        state = quota_cache.get(telegram_id)
+        if state is not None:
+            return state
 
+        async with get_db() as session:
+            user = await SQLAlchemyUserRepository(session).get_by_telegram_id(telegram_id)
+            if not user:
+                return None
+            subscription = await SQLAlchemySubscriptionRepository(session).get_active_subscription(telegram_id)
+
+        state = QuotaState(
+            daily_token_limit=user.daily_token_limit,
+            tokens_used_today=user.tokens_used_today or 0,
+            subscription_type=subscription.type if subscription else None
+        )
+        quota_cache.set(telegram_id, state)
+        return state
 
     @classmethod
     async def check_limit_tokens(cls, telegram_id: int) -> tuple[bool, str]:
-        async with get_db() as session:
-            repo = SQLAlchemyUserRepository(session)
-            has_tokens, status = await repo.check_token_limit(telegram_id)
-            if has_tokens is False and "не найден" in status:
-                return "Зарегистрируйтесь с помощью команды /start, или напишите в поддержку"
-            return (has_tokens, status)
\ No newline at end of file
+        state = await cls.get_quota_state(telegram_id)
+        if state is None:
+            return False, "Зарегистрируйтесь с помощью команды /start, или напишите в поддержку"
+        status = f"{state.tokens_used_today}/{state.daily_token_limit} токенов"
+        return state.can_chat, status
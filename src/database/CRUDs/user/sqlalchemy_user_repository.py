@@ -1,10 +1,11 @@
 from typing import Optional
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import User
-from src.database.CRUDs.user.user_dto import UserCreateDTO, UserUpdateDTO
+from src.database.models import User, Subscription
+from src.database.CRUDs.user.user_dto import UserCreateDTO, UserUpdateDTO, UserTokenBalanceDTO
 from src.database.CRUDs.user.user_repository_interface import IUserRepository
+from src.database.CRUDs.subscription.subscription_dto import SubscriptionStatus
 
 
 class SQLAlchemyUserRepository(IUserRepository):
@@ -65,13 +66,62 @@ class SQLAlchemyUserRepository(IUserRepository):
         user.username = username
         return True
 
-    async def add_tokens_used(self, telegram_id: int, tokens: int) -> bool:
-        user = await self.get_by_telegram_id(telegram_id)
-        if not user:
-            return False
+    async def add_tokens_used(self, telegram_id: int, tokens: int) -> Optional[UserTokenBalanceDTO]:
+        # Атомарный инкремент: параллельные ходы не затирают друг друга
+        result = await self._session.execute(
+            update(User)
+            .where(User.telegram_id == telegram_id)
+            .values(tokens_used_today=func.greatest(func.coalesce(User.tokens_used_today, 0) + tokens, 0))
+            .returning(User.tokens_used_today, User.daily_token_limit)
+        )
+        row = result.first()
+        if not row:
+            return None
 
-        user.tokens_used_today += tokens
-        return True
+        return UserTokenBalanceDTO(
+            telegram_id=telegram_id,
+            tokens_used_today=row.tokens_used_today,
+            daily_token_limit=row.daily_token_limit
+        )
+
+    async def reserve_tokens(self, telegram_id: int, tokens: int) -> Optional[UserTokenBalanceDTO]:
+        # Списываем резерв только если он целиком помещается в дневной лимит
+        used = func.coalesce(User.tokens_used_today, 0)
+        # Тариф читаем в том же запросе: его могли сменить другие процессы (оплата, истечение)
+        subscription_type = (
+            select(Subscription.type)
+            .where(
+                Subscription.user_id == User.id,
+                Subscription.status == SubscriptionStatus.ACTIVE
+            )
+            .order_by(Subscription.expires_at.desc())
+            .limit(1)
+            .correlate(User)
+            .scalar_subquery()
+        )
+        result = await self._session.execute(
+            update(User)
+            .where(
+                User.telegram_id == telegram_id,
+                used + tokens <= User.daily_token_limit
+            )
+            .values(tokens_used_today=used + tokens)
+            .returning(
+                User.tokens_used_today,
+                User.daily_token_limit,
+                subscription_type.label("subscription_type")
+            )
+        )
+        row = result.first()
+        if not row:
+            return None
+
+        return UserTokenBalanceDTO(
+            telegram_id=telegram_id,
+            tokens_used_today=row.tokens_used_today,
+            daily_token_limit=row.daily_token_limit,
+            subscription_type=row.subscription_type
+        )
 
     async def reset_daily_tokens(self) -> int:
         result = await self._session.execute(
@@ -22,6 +22,18 @@ class UserTokenUsageDTO:
     tokens_used: int
 
 
+@dataclass
+class UserTokenBalanceDTO:
+    telegram_id: int
+    tokens_used_today: int
+    daily_token_limit: int
+    subscription_type: Optional[str] = None
+
+    @property
+    def remaining(self) -> int:
+        return max(self.daily_token_limit - self.tokens_used_today, 0)
+
+
 @dataclass
 class UserResponseDTO:
     id: int
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 from src.database.models import User
-from src.database.CRUDs.user.user_dto import UserCreateDTO, UserUpdateDTO
+from src.database.CRUDs.user.user_dto import UserCreateDTO, UserUpdateDTO, UserTokenBalanceDTO
 
 
 class IUserRepository(ABC):
@@ -27,7 +27,11 @@ class IUserRepository(ABC):
         pass
 
     @abstractmethod
-    async def add_tokens_used(self, telegram_id: int, tokens: int) -> bool:
+    async def add_tokens_used(self, telegram_id: int, tokens: int) -> Optional[UserTokenBalanceDTO]:
+        pass
+
+    @abstractmethod
+    async def reserve_tokens(self, telegram_id: int, tokens: int) -> Optional[UserTokenBalanceDTO]:
         pass
 
     @abstractmethod
@@ -0,0 +1,101 @@
+"""add_messages
+
+Revision ID: 455161cc6a8e
+Revises: 4b0d7531d2f3
+Create Date: 2026-10-18 12:04:17.512308
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '455161cc6a8e'
+down_revision: Union[str, Sequence[str], None] = '4b0d7531d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('messages',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('dialogue_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('token_count', sa.Integer(), nullable=True),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['dialogue_id'], ['public.dialogues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    schema='public'
+    )
+    op.create_index('ix_messages_dialogue_id_seq', 'messages', ['dialogue_id', 'seq'], unique=True, schema='public')
+
+    # Переносим историю из JSON: порядок элементов массива становится seq
+    op.execute("""
+        INSERT INTO public.messages (dialogue_id, seq, role, content, token_count, metadata, timestamp)
+        SELECT d.id,
+               m.ordinality,
+               m.value->>'role',
+               COALESCE(m.value->>'content', ''),
+               (m.value->>'token_count')::integer,
+               m.value->'metadata',
+               COALESCE((m.value->>'timestamp')::timestamp, d.updated_at)
+        FROM public.dialogues d
+        CROSS JOIN LATERAL json_array_elements(d.conversation_history) WITH ORDINALITY AS m(value, ordinality)
+    """)
+
+    # Сообщения, сохранённые до появления token_count, считаем один раз здесь
+    from src.ai.tokenizer import count_tokens
+
+    connection = op.get_bind()
+    while True:
+        rows = connection.execute(sa.text(
+            "SELECT id, content FROM public.messages WHERE token_count IS NULL LIMIT :limit"
+        ), {"limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        connection.execute(
+            sa.text("UPDATE public.messages SET token_count = :token_count WHERE id = :id"),
+            [{"id": row.id, "token_count": count_tokens(row.content)} for row in rows]
+        )
+
+    op.alter_column('messages', 'token_count', nullable=False, schema='public')
+    op.drop_column('dialogues', 'conversation_history', schema='public')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('dialogues', sa.Column(
+        'conversation_history',
+        postgresql.JSON(astext_type=sa.Text()),
+        server_default=sa.text("'[]'::json"),
+        nullable=False
+    ), schema='public')
+
+    op.execute("""
+        UPDATE public.dialogues d
+        SET conversation_history = h.history
+        FROM (
+            SELECT dialogue_id,
+                   json_agg(json_strip_nulls(json_build_object(
+                       'role', role,
+                       'content', content,
+                       'token_count', token_count,
+                       'timestamp', timestamp,
+                       'metadata', metadata
+                   )) ORDER BY seq) AS history
+            FROM public.messages
+            GROUP BY dialogue_id
+        ) h
+        WHERE d.id = h.dialogue_id
+    """)
+
+    op.drop_index('ix_messages_dialogue_id_seq', table_name='messages', schema='public')
+    op.drop_table('messages', schema='public')
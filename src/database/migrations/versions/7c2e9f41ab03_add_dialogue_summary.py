@@ -0,0 +1,39 @@
+"""add_dialogue_summary
+
+Revision ID: 7c2e9f41ab03
+Revises: 455161cc6a8e
+Create Date: 2026-10-18 15:21:43.208114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9f41ab03'
+down_revision: Union[str, Sequence[str], None] = '455161cc6a8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('dialogues', sa.Column('summary', sa.Text(), nullable=True), schema='public')
+    op.add_column(
+        'dialogues',
+        sa.Column('summary_token_count', sa.Integer(), server_default='0', nullable=False),
+        schema='public'
+    )
+    op.add_column(
+        'dialogues',
+        sa.Column('summary_seq', sa.Integer(), server_default='0', nullable=False),
+        schema='public'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('dialogues', 'summary_seq', schema='public')
+    op.drop_column('dialogues', 'summary_token_count', schema='public')
+    op.drop_column('dialogues', 'summary', schema='public')
@@ -0,0 +1,44 @@
+"""add_payments
+
+Revision ID: d41f8a27c5e9
+Revises: 7c2e9f41ab03
+Create Date: 2026-10-18 19:02:37.640519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f8a27c5e9'
+down_revision: Union[str, Sequence[str], None] = '7c2e9f41ab03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payment_id', sa.String(length=64), nullable=False),
+    sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('days', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('checked_at', sa.DateTime(), nullable=True),
+    sa.Column('next_check_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('payment_id'),
+    schema='public'
+    )
+    op.create_index('ix_payments_telegram_id', 'payments', ['telegram_id'], unique=False, schema='public')
+    op.create_index('ix_payments_status_next_check_at', 'payments', ['status', 'next_check_at'], unique=False, schema='public')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payments_status_next_check_at', table_name='payments', schema='public')
+    op.drop_index('ix_payments_telegram_id', table_name='payments', schema='public')
+    op.drop_table('payments', schema='public')
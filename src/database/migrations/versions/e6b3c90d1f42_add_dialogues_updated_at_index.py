@@ -0,0 +1,40 @@
+"""add_dialogues_updated_at_index
+
+Revision ID: e6b3c90d1f42
+Revises: d41f8a27c5e9
+Create Date: 2026-10-18 21:14:09.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3c90d1f42'
+down_revision: Union[str, Sequence[str], None] = 'd41f8a27c5e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # updated_at не обновлялся при добавлении сообщений — восстанавливаем по последнему сообщению
+    op.execute(
+        """
+        UPDATE public.dialogues AS d
+        SET updated_at = m.last_at
+        FROM (
+            SELECT dialogue_id, MAX(timestamp) AS last_at
+            FROM public.messages
+            GROUP BY dialogue_id
+        ) AS m
+        WHERE m.dialogue_id = d.id AND m.last_at > d.updated_at
+        """
+    )
+    op.create_index('ix_dialogues_updated_at', 'dialogues', ['updated_at'], unique=False, schema='public')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_dialogues_updated_at', table_name='dialogues', schema='public')
@@ -1,5 +1,4 @@
-from typing import Optional, List
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Sequence, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Sequence, JSON, Index, Numeric
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -38,6 +37,7 @@ class User(Base):
 class Dialogue(Base):
     __tablename__ = 'dialogues'
     __table_args__ = (
+        Index('ix_dialogues_updated_at', 'updated_at'),
         {'schema': 'public'},
     )
 
@@ -48,7 +48,10 @@ class Dialogue(Base):
         nullable=False,
         unique=True
     )
-    conversation_history = Column(JSON, nullable=False, default=list)
+    # Сжатое содержание сообщений с seq <= summary_seq
+    summary = Column(Text, nullable=True)
+    summary_token_count = Column(Integer, nullable=False, default=0, server_default='0')
+    summary_seq = Column(Integer, nullable=False, default=0, server_default='0')
     updated_at = Column(
         DateTime(timezone=False),
         server_default=func.now(),
@@ -61,12 +64,42 @@ class Dialogue(Base):
 
     user = relationship("User", back_populates="dialogue")
 
-    def __init__(self, user_id: int, conversation_history: Optional[List] = None):
-        self.user_id = user_id
-        self.conversation_history = conversation_history or []
+    messages = relationship(
+        "Message",
+        back_populates="dialogue",
+        order_by="Message.seq",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    def __repr__(self):
+        return f"<Dialogue(id={self.id}, user_id={self.user_id}, updated_at={self.updated_at})>"
+
+
+class Message(Base):
+    __tablename__ = 'messages'
+    __table_args__ = (
+        Index('ix_messages_dialogue_id_seq', 'dialogue_id', 'seq', unique=True),
+        {'schema': 'public'},
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    dialogue_id = Column(
+        Integer,
+        ForeignKey('public.dialogues.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    seq = Column(Integer, nullable=False)  # порядковый номер сообщения внутри диалога
+    role = Column(String(20), nullable=False)  # 'user', 'assistant', 'system'
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False, default=0)
+    metadata_ = Column('metadata', JSON, nullable=True)
+    timestamp = Column(DateTime(timezone=False), server_default=func.now())
+
+    dialogue = relationship("Dialogue", back_populates="messages")
 
     def __repr__(self):
-        return f"<Dialogue(id={self.id}, user_id={self.user_id}, conversation_history={self.conversation_history}, updated_at={self.updated_at})>"
+        return f"<Message(id={self.id}, dialogue_id={self.dialogue_id}, seq={self.seq}, role='{self.role}')>"
 
 
 class Subscription(Base):
@@ -88,4 +121,27 @@ class Subscription(Base):
     user = relationship("User", back_populates="subscriptions")
 
     def __repr__(self):
-        return f"<Subscription(id={self.id}, user_id={self.user_id}, type='{self.type}', status='{self.status}')>"
\ No newline at end of file
+        return f"<Subscription(id={self.id}, user_id={self.user_id}, type='{self.type}', status='{self.status}')>"
+
+
+class Payment(Base):
+    __tablename__ = 'payments'
+    __table_args__ = (
+        # Сверка выбирает ожидающие платежи, срок проверки которых наступил
+        Index('ix_payments_status_next_check_at', 'status', 'next_check_at'),
+        Index('ix_payments_telegram_id', 'telegram_id'),
+        {'schema': 'public'},
+    )
+
+    id = Column(Integer, primary_key=True)
+    payment_id = Column(String(64), nullable=False, unique=True)  # ID платежа в YooKassa
+    telegram_id = Column(BigInteger, nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    days = Column(Integer, nullable=False)
+    status = Column(String(50), nullable=False, default="pending")  # "pending", "succeeded", "canceled", "expired"
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    checked_at = Column(DateTime, nullable=True)
+    next_check_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Payment(id={self.id}, payment_id='{self.payment_id}', telegram_id={self.telegram_id}, status='{self.status}')>"
@@ -4,21 +4,35 @@ import asyncio
 from sqlalchemy import update, select
 from src.database.models import User, Subscription
 from src.database.CRUDs.context_manager import get_db
+from src.database.CRUDs.quota_cache import quota_cache
+
+
+def _seconds_until_reset() -> float:
+    now = datetime.utcnow()
+    next_reset = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0)
+    return (next_reset - now).total_seconds()
 
 
 async def reset_daily_limits():
     while True:
-        now = datetime.utcnow()
-        next_reset = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0)
-        sleep_seconds = (next_reset - now).total_seconds()
-
-        await asyncio.sleep(sleep_seconds)
+        await asyncio.sleep(_seconds_until_reset())
 
         async with get_db() as session:
             await session.execute(
                 update(User)
                 .values(tokens_used_today=0)
             )
+        quota_cache.reset_usage()
+
+
+async def expire_quota_cache_daily(delay: float = 30):
+    """
+    Для процессов, где reset_daily_limits не запущен: после ежедневного
+    сброса в БД (с запасом delay секунд) очищает локальный кэш квот.
+    """
+    while True:
+        await asyncio.sleep(_seconds_until_reset() + delay)
+        quota_cache.clear()
 
 
 async def check_expired_subscriptions():
@@ -27,12 +41,14 @@ async def check_expired_subscriptions():
         current_time = datetime.utcnow()
         async with get_db() as session:
             try:
-                stmt = select(Subscription.user_id).where(
+                stmt = select(Subscription.user_id, User.telegram_id).join(
+                    User, Subscription.user_id == User.id
+                ).where(
                     Subscription.status == "active",
                     Subscription.expires_at <= current_time
                 ).distinct()
 
-                result = await session.execute(stmt)
+                result = (await session.execute(stmt)).all()
                 expired_user_ids = [row[0] for row in result]
 
                 if expired_user_ids:
@@ -48,6 +64,8 @@ async def check_expired_subscriptions():
                         .values(daily_token_limit=10000)
                     )
                     await session.commit()
+                    for row in result:
+                        quota_cache.invalidate(row[1])
                     logging.info(f"Updated {len(expired_user_ids)} expired subscriptions")
 
             except Exception as e:
@@ -1,37 +1,144 @@
+from typing import List
+
 from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 from config import _Config
 from bot.handlers import main_router
-from src.database.tasks import reset_daily_limits, check_expired_subscriptions
-import asyncio, logging
+from src.database.tasks import reset_daily_limits, check_expired_subscriptions, expire_quota_cache_daily
+from src.ai.api_client import close_client
+from src.ai.tokenizer import shutdown_tokenizer
+from src.ai.summarizer import summarize_dialogues
+from src.payments.payment_manager import PaymentManager
+from src.payments.payment_webhook import register_payment_webhook
+import asyncio, logging, signal
+
 
+logging.basicConfig(
+    level=_Config.LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 bot = Bot(token=_Config.TELEGRAM_BOT_TOKEN)
 dp = Dispatcher()
 
 dp.include_router(main_router)
 
+background_tasks: List[asyncio.Task] = []
 
-async def main():
-    reset_task = asyncio.create_task(reset_daily_limits())
-    check_sub_task = asyncio.create_task(check_expired_subscriptions())
+
+async def on_startup(bot: Bot):
+    await PaymentManager.start()
+    if _Config.RUN_BACKGROUND_TASKS:
+        background_tasks.append(asyncio.create_task(reset_daily_limits()))
+        background_tasks.append(asyncio.create_task(check_expired_subscriptions()))
+        background_tasks.append(asyncio.create_task(PaymentManager.reconcile_payments()))
+        if _Config.SUMMARY_ENABLED:
+            background_tasks.append(asyncio.create_task(summarize_dialogues()))
+    else:
+        # Лимиты в БД сбрасывает другой процесс, здесь достаточно забыть кэш
+        background_tasks.append(asyncio.create_task(expire_quota_cache_daily()))
+
+    if _Config.BOT_MODE == "webhook" and _Config.WEBHOOK_SET_ON_STARTUP:
+        await bot.set_webhook(
+            url=f"{_Config.WEBHOOK_BASE_URL.rstrip('/')}{_Config.WEBHOOK_PATH}",
+            secret_token=_Config.WEBHOOK_SECRET
+        )
+        logging.info("Webhook registered")
+
+
+async def on_shutdown(bot: Bot):
+    for task in background_tasks:
+        task.cancel()
+    try:
+        await asyncio.gather(
+            *background_tasks,
+            return_exceptions=True
+        )
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logging.error(f"Error while stopping tasks: {e}")
+    background_tasks.clear()
+    logging.info("Background tasks stopped")
+    await PaymentManager.cleanup()
+    await close_client()
+    shutdown_tokenizer()
+
+
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
+
+
+async def healthcheck(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+async def serve(app: web.Application, handle_signals: bool = False):
+    """
+    Обслуживает app до отмены задачи или, при handle_signals, до SIGTERM/SIGINT.
+    runner.cleanup() запускает on_shutdown приложения (и диспетчера).
+    """
+    stop = asyncio.Event()
+    if handle_signals:
+        # docker/systemd останавливают процесс SIGTERM, супервизор — SIGINT
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=_Config.WEBHOOK_HOST, port=_Config.WEBHOOK_PORT)
+    try:
+        await site.start()
+        logging.info(f"HTTP server listening on {_Config.WEBHOOK_HOST}:{_Config.WEBHOOK_PORT}")
+        await stop.wait()
+        logging.info("Shutdown signal received")
+    finally:
+        await runner.cleanup()
+
+
+async def run_polling():
+    # Уведомления об оплате принимает отдельный HTTP-сервер рядом с polling;
+    # сигналы здесь обрабатывает сам aiogram
+    server_task = None
+    if _Config.YUKASSA_WEBHOOK_ENABLED:
+        app = web.Application()
+        app.router.add_get("/healthz", healthcheck)
+        register_payment_webhook(app)
+        server_task = asyncio.create_task(serve(app))
     try:
         await dp.start_polling(bot)
     except Exception as e:
         logging.error(f"Bot stopped with error: {e}")
     finally:
-        reset_task.cancel()
-        check_sub_task.cancel()
-        try:
-            await asyncio.gather(
-                reset_task,
-                check_sub_task,
-                return_exceptions=True
-            )
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            logging.error(f"Error while stopping tasks: {e}")
-        logging.info("Background tasks stopped")
+        if server_task:
+            server_task.cancel()
+            await asyncio.gather(server_task, return_exceptions=True)
+
+
+async def run_webhook():
+    app = web.Application()
+    app.router.add_get("/healthz", healthcheck)
+    # Запросы без верного X-Telegram-Bot-Api-Secret-Token отклоняются
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=_Config.WEBHOOK_SECRET
+    ).register(app, path=_Config.WEBHOOK_PATH)
+    if _Config.YUKASSA_WEBHOOK_ENABLED:
+        register_payment_webhook(app)
+    # Связывает startup/shutdown приложения с событиями диспетчера
+    setup_application(app, dp, bot=bot)
+
+    await serve(app, handle_signals=True)
+
+
+async def main():
+    if _Config.BOT_MODE == "webhook":
+        await run_webhook()
+    else:
+        await run_polling()
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
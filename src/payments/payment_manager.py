@@ -5,6 +5,7 @@ from typing import Optional, Dict, Any
 import aiohttp
 import base64
 from src.config import _Config
+from src.database.CRUDs.payment import AsyncPaymentService, PaymentCreateDTO, PaymentResponseDTO, PaymentStatus
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -17,8 +18,32 @@ class PaymentManager:
     SECRET_KEY = _Config.YUKASSA_SECRET_KEY
 
 
-    _active_checks: Dict[str, asyncio.Task] = {}
+    # Общая сессия с пулом keep-alive соединений к api.yookassa.ru
+    _session: Optional[aiohttp.ClientSession] = None
 
+    @classmethod
+    async def start(cls) -> None:
+        """Открывает общую HTTP-сессию; вызывается при старте бота."""
+        if cls._session is not None and not cls._session.closed:
+            return
+        cls._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=_Config.YUKASSA_MAX_CONNECTIONS,
+                keepalive_timeout=_Config.YUKASSA_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=_Config.YUKASSA_REQUEST_TIMEOUT,
+                connect=_Config.YUKASSA_CONNECT_TIMEOUT
+            ),
+            headers={"Authorization": f"Basic {cls._get_auth_header()}"}
+        )
+
+    @classmethod
+    async def _get_session(cls) -> aiohttp.ClientSession:
+        if cls._session is None or cls._session.closed:
+            await cls.start()
+        return cls._session
 
     @staticmethod
     def _get_auth_header() -> str:
@@ -34,52 +59,60 @@ class PaymentManager:
             description: str = "Premium подписка"
     ) -> Optional[Dict[str, Any]]:
         try:
-            async with aiohttp.ClientSession() as session:
-                data = {
-                    "amount": {
-                        "value": f"{amount:.2f}",
-                        "currency": "RUB"
-                    },
-                    "confirmation": {
-                        "type": "redirect",
-                        "return_url": f"https://t.me/HpKrBot?start=payment_{telegram_id}"
-                    },
-                    "capture": True,
-                    "description": f"{description} на {days} дней",
-                    "metadata": {
-                        "telegram_id": telegram_id,
-                        "days": days,
-                        "type": "premium",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
+            session = await cls._get_session()
+            data = {
+                "amount": {
+                    "value": f"{amount:.2f}",
+                    "currency": "RUB"
+                },
+                "confirmation": {
+                    "type": "redirect",
+                    "return_url": f"https://t.me/HpKrBot?start=payment_{telegram_id}"
+                },
+                "capture": True,
+                "description": f"{description} на {days} дней",
+                "metadata": {
+                    "telegram_id": telegram_id,
+                    "days": days,
+                    "type": "premium",
+                    "timestamp": datetime.utcnow().isoformat()
                 }
-
-                headers = {
-                    "Authorization": f"Basic {cls._get_auth_header()}",
-                    "Idempotence-Key": str(datetime.utcnow().timestamp()),
-                    "Content-Type": "application/json"
+            }
+
+            headers = {
+                "Idempotence-Key": str(datetime.utcnow().timestamp()),
+                "Content-Type": "application/json"
+            }
+
+            async with session.post(
+                    "https://api.yookassa.ru/v3/payments",
+                    json=data,
+                    headers=headers
+            ) as response:
+                if response.status != 200:
+                    logger.error(f"Payment creation failed: {await response.text()}")
+                    return None
+
+                result = await response.json()
+
+            # Первая сверка — через интервал опроса; дальше интервалы растут с возрастом платежа
+            await AsyncPaymentService.register_payment(PaymentCreateDTO(
+                payment_id=result["id"],
+                telegram_id=telegram_id,
+                amount=amount,
+                days=days,
+                next_check_at=datetime.utcnow() + timedelta(seconds=_Config.YUKASSA_POLL_INTERVAL)
+            ))
+
+            return {
+                    "payment_id": result["id"],
+                    "payment_url": result["confirmation"]["confirmation_url"],
+                    "status": result["status"],
+                    "amount": amount,
+                    "days": days,
+                    "telegram_id": telegram_id
                 }
 
-                async with session.post(
-                        "https://api.yookassa.ru/v3/payments",
-                        json=data,
-                        headers=headers
-                ) as response:
-                    if response.status != 200:
-                        logger.error(f"Payment creation failed: {await response.text()}")
-                        return None
-
-                    result = await response.json()
-
-                    return {
-                        "payment_id": result["id"],
-                        "payment_url": result["confirmation"]["confirmation_url"],
-                        "status": result["status"],
-                        "amount": amount,
-                        "days": days,
-                        "telegram_id": telegram_id
-                    }
-
         except Exception as e:
             logger.error(f"Error creating payment: {e}")
             return None
@@ -87,102 +120,124 @@ class PaymentManager:
     @classmethod
     async def check_payment_status(cls, payment_id: str) -> Optional[Dict[str, Any]]:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Basic {cls._get_auth_header()}"
-                }
-
-                async with session.get(
-                        f"https://api.yookassa.ru/v3/payments/{payment_id}",
-                        headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return None
+            session = await cls._get_session()
+            async with session.get(
+                    f"https://api.yookassa.ru/v3/payments/{payment_id}"
+            ) as response:
+                if response.status != 200:
+                    return None
 
-                    return await response.json()
+                return await response.json()
 
         except Exception as e:
             logger.error(f"Error checking payment status: {e}")
             return None
 
-    @classmethod
-    async def start_background_check(
-            cls,
-            payment_id: str,
-            telegram_id: int,
-            timeout_minutes: int = 5
-    ) -> None:
-        if payment_id in cls._active_checks:
-            cls._active_checks[payment_id].cancel()
-
-        task = asyncio.create_task(
-            cls._background_check_worker(payment_id, telegram_id, timeout_minutes)
-        )
-        cls._active_checks[payment_id] = task
-
-        logger.info(f"Started background check for payment {payment_id}")
+    @staticmethod
+    def _next_check_delay(age: timedelta) -> float:
+        """Свежие платежи проверяются часто, старые — всё реже."""
+        if age < timedelta(minutes=10):
+            return _Config.YUKASSA_POLL_INTERVAL
+        if age < timedelta(hours=1):
+            return max(_Config.YUKASSA_POLL_INTERVAL, 60)
+        return max(_Config.YUKASSA_POLL_INTERVAL, 600)
 
     @classmethod
-    async def _background_check_worker(
-            cls,
-            payment_id: str,
-            telegram_id: int,
-            timeout_minutes: int
-    ) -> None:
-        end_time = datetime.utcnow() + timedelta(minutes=timeout_minutes)
-        check_interval = 10  # секунд
-
-        while datetime.utcnow() < end_time:
+    async def reconcile_payments(cls) -> None:
+        """
+        Фоновая задача: сверяет ожидающие платежи из БД с YooKassa.
+
+        Состояние хранится в таблице payments, поэтому сверка переживает
+        перезапуск; одновременно проверяется не больше
+        YUKASSA_RECONCILE_CONCURRENCY платежей.
+        """
+        semaphore = asyncio.Semaphore(_Config.YUKASSA_RECONCILE_CONCURRENCY)
+
+        async def reconcile(payment: PaymentResponseDTO) -> None:
+            async with semaphore:
+                try:
+                    await cls._reconcile_payment(payment)
+                except Exception as e:
+                    logger.error(f"Error reconciling payment {payment.payment_id}: {e}")
+
+        while True:
+            await asyncio.sleep(_Config.YUKASSA_RECONCILE_TICK)
             try:
-                status_data = await cls.check_payment_status(payment_id)
-
-                if status_data:
-                    status = status_data.get("status")
-
-                    if status == "succeeded":
-                        await cls._process_successful_payment(status_data, telegram_id)
-                        break
-                    elif status in ["canceled", "expired"]:
-                        logger.info(f"Payment {payment_id} was {status}")
-                        break
-
-                await asyncio.sleep(check_interval)
-
+                payments = await AsyncPaymentService.get_due_payments(
+                    datetime.utcnow(),
+                    limit=_Config.YUKASSA_RECONCILE_BATCH
+                )
+                await asyncio.gather(*(reconcile(payment) for payment in payments))
             except Exception as e:
-                logger.error(f"Error in background check: {e}")
-                await asyncio.sleep(check_interval)
-
-        if payment_id in cls._active_checks:
-            del cls._active_checks[payment_id]
-
-        logger.info(f"Background check finished for payment {payment_id}")
+                logger.error(f"Error in payment reconciler: {e}")
 
     @classmethod
-    async def _process_successful_payment(
-            cls,
-            status_data: Dict[str, Any],
-            telegram_id: int
-    ) -> None:
-        try:
-            metadata = status_data.get("metadata", {})
-
-            days_str = metadata.get("days", "30")
-            days = int(days_str)
+    async def _reconcile_payment(cls, payment: PaymentResponseDTO) -> None:
+        status_data = await cls.check_payment_status(payment.payment_id)
+        status = status_data.get("status") if status_data else None
+
+        if status == "succeeded":
+            await cls.confirm_payment(status_data)
+            return
+        if status == "canceled":
+            await cls.cancel_payment(payment.payment_id)
+            return
+
+        now = datetime.utcnow()
+        age = now - payment.created_at
+        if age > timedelta(hours=_Config.YUKASSA_PAYMENT_TTL_HOURS):
+            await AsyncPaymentService.close_payment(payment.payment_id, PaymentStatus.EXPIRED)
+            logger.info(f"Payment {payment.payment_id} expired without confirmation")
+            return
+
+        await AsyncPaymentService.schedule_check(
+            payment.payment_id,
+            now + timedelta(seconds=cls._next_check_delay(age))
+        )
 
-            from src.database.CRUDs.subscription import AsyncSubscriptionService
+    @classmethod
+    async def confirm_payment(cls, status_data: Dict[str, Any]) -> bool:
+        """
+        Выдаёт подписку по успешному платежу ровно один раз.
 
-            await AsyncSubscriptionService.create_subscription(
-                telegram_id=telegram_id,
-                subscription_type="premium",
-                days=days
-            )
+        Args:
+            status_data: Платёж, полученный из API YooKassa
 
-            logger.info(f"Subscription activated for user {telegram_id}, {days} days")
+        Returns:
+            True, если подписка по платежу выдана (сейчас или раньше)
+        """
+        payment_id = status_data["id"]
+        try:
+            payment = await AsyncPaymentService.get_payment(payment_id)
+            if payment is None:
+                # Платёж создан до появления таблицы payments — восстанавливаем по metadata
+                metadata = status_data.get("metadata", {})
+                payment = await AsyncPaymentService.register_payment(PaymentCreateDTO(
+                    payment_id=payment_id,
+                    telegram_id=int(metadata["telegram_id"]),
+                    amount=float(status_data["amount"]["value"]),
+                    days=int(metadata.get("days", 30))
+                ))
+            if payment.status == PaymentStatus.SUCCEEDED:
+                return True
+
+            completed = await AsyncPaymentService.complete_payment(payment_id)
+            if completed:
+                logger.info(f"Subscription activated for user {completed.telegram_id}, {completed.days} days")
+                return True
+
+            # Платёж успел подтвердить параллельный обработчик
+            payment = await AsyncPaymentService.get_payment(payment_id)
+            return payment is not None and payment.status == PaymentStatus.SUCCEEDED
 
         except Exception as e:
             logger.error(f"Error processing successful payment: {e}")
+            return False
 
-
+    @classmethod
+    async def cancel_payment(cls, payment_id: str) -> None:
+        if await AsyncPaymentService.close_payment(payment_id, PaymentStatus.CANCELED):
+            logger.info(f"Payment {payment_id} was canceled")
 
     @classmethod
     def create_payment_keyboard(cls, payment_url: str) -> InlineKeyboardMarkup:
@@ -200,8 +255,7 @@ class PaymentManager:
 
     @classmethod
     async def cleanup(cls) -> None:
-        for payment_id, task in cls._active_checks.items():
-            task.cancel()
-
-        cls._active_checks.clear()
+        if cls._session is not None:
+            await cls._session.close()
+            cls._session = None
         logger.info("Payment manager cleaned up")
\ No newline at end of file
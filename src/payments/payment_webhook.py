@@ -0,0 +1,81 @@
+import ipaddress
+import json
+import logging
+
+from aiohttp import web
+from src.config import _Config
+from src.payments.payment_manager import PaymentManager
+
+logger = logging.getLogger(__name__)
+
+# Адреса, с которых YooKassa отправляет уведомления
+YOOKASSA_NETWORKS = [
+    ipaddress.ip_network(network) for network in (
+        "185.71.76.0/27",
+        "185.71.77.0/27",
+        "77.75.153.0/25",
+        "77.75.156.11/32",
+        "77.75.156.35/32",
+        "77.75.154.128/25",
+        "2a02:5180::/32",
+    )
+]
+
+HANDLED_EVENTS = ("payment.succeeded", "payment.canceled")
+
+
+def client_ip(request: web.Request) -> str:
+    """Адрес отправителя; за доверенным прокси берётся последний из X-Forwarded-For."""
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded and request.remote in _Config.YUKASSA_TRUSTED_PROXIES:
+        return forwarded.split(",")[-1].strip()
+    return request.remote or ""
+
+
+def is_yookassa_ip(ip: str) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in YOOKASSA_NETWORKS)
+
+
+async def yookassa_webhook(request: web.Request) -> web.Response:
+    """
+    Уведомление YooKassa о смене статуса платежа.
+
+    Телу уведомления не доверяем: статус перепроверяется запросом к API,
+    а подписка выдаётся идемпотентно (PaymentManager.confirm_payment).
+    На временные ошибки отвечаем 500 — YooKassa повторит уведомление.
+    """
+    ip = client_ip(request)
+    if not is_yookassa_ip(ip):
+        logger.warning(f"Rejected payment notification from {ip}")
+        return web.Response(status=403)
+
+    try:
+        notification = json.loads(await request.read())
+        event = notification["event"]
+        payment_id = notification["object"]["id"]
+    except (ValueError, KeyError, TypeError):
+        return web.Response(status=400)
+
+    if event not in HANDLED_EVENTS:
+        return web.Response(status=200)
+
+    status_data = await PaymentManager.check_payment_status(payment_id)
+    if not status_data:
+        return web.Response(status=500)
+
+    status = status_data.get("status")
+    if status == "succeeded":
+        if not await PaymentManager.confirm_payment(status_data):
+            return web.Response(status=500)
+    elif status == "canceled":
+        await PaymentManager.cancel_payment(payment_id)
+
+    return web.Response(status=200)
+
+
+def register_payment_webhook(app: web.Application) -> None:
+    app.router.add_post(_Config.YUKASSA_WEBHOOK_PATH, yookassa_webhook)
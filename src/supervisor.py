@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from typing import List, Optional
+
+import aiohttp
+from aiogram import Bot
+from aiohttp import web
+from config import _Config
+from src.payments.payment_webhook import client_ip
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def routing_key(update: dict) -> int:
+    """
+    ID пользователя, от которого пришло обновление: все его обновления
+    попадают в один воркер, где живут его очередь ходов и кэши.
+    """
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        for field in ("from", "user", "chat"):
+            entity = value.get(field)
+            if isinstance(entity, dict) and "id" in entity:
+                return int(entity["id"])
+    return int(update.get("update_id", 0))
+
+
+def budget_share(total: int, workers_count: int) -> int:
+    """Доля общего лимита на один воркер: в сумме воркеры не превышают total."""
+    return max(total // workers_count, 1)
+
+
+class Worker:
+    """Процесс бота в режиме webhook на локальном порту."""
+
+    def __init__(self, index: int, port: int, primary: bool, workers_count: int = 1):
+        self.index = index
+        self.port = port
+        self.primary = primary
+        self.workers_count = workers_count
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.failures = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{_Config.SUPERVISOR_WORKER_HOST}:{self.port}"
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        env = dict(
+            os.environ,
+            BOT_MODE="webhook",
+            WEBHOOK_HOST=_Config.SUPERVISOR_WORKER_HOST,
+            WEBHOOK_PORT=str(self.port),
+            WEBHOOK_SET_ON_STARTUP="false",
+            # Задачи с записью в БД — только в одном воркере
+            RUN_BACKGROUND_TASKS="true" if self.primary else "false",
+            # Лимиты провайдера соблюдаются внутри процесса, поэтому делим их между воркерами
+            DEEPSEEK_MAX_CONCURRENCY=str(budget_share(_Config.DEEPSEEK_MAX_CONCURRENCY, self.workers_count)),
+            DEEPSEEK_MAX_CONNECTIONS=str(budget_share(_Config.DEEPSEEK_MAX_CONNECTIONS, self.workers_count)),
+            LLM_TOKENS_PER_MINUTE=str(budget_share(_Config.LLM_TOKENS_PER_MINUTE, self.workers_count))
+        )
+        self.process = await asyncio.create_subprocess_exec(sys.executable, WORKER_SCRIPT, env=env)
+        self.failures = 0
+        logger.info(f"Worker {self.index} started on port {self.port} (pid {self.process.pid})")
+
+    async def stop(self, timeout: float = 10) -> None:
+        if not self.alive:
+            return
+        # SIGINT, а не SIGTERM: asyncio.run воркера корректно завершит фоновые задачи
+        self.process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Worker {self.index} did not stop in {timeout}s, killing")
+            self.process.kill()
+            await self.process.wait()
+
+
+class Supervisor:
+    """
+    Принимает webhook Telegram и пересылает каждое обновление воркеру
+    по хэшу telegram_id; следит за здоровьем воркеров и перезапускает их.
+
+    DEEPSEEK_MAX_CONCURRENCY, DEEPSEEK_MAX_CONNECTIONS и LLM_TOKENS_PER_MINUTE
+    задают общий лимит: каждый воркер получает свою равную долю.
+    """
+
+    def __init__(self, workers_count: int):
+        self.workers: List[Worker] = [
+            Worker(index, _Config.SUPERVISOR_WORKER_BASE_PORT + index, primary=index == 0, workers_count=workers_count)
+            for index in range(workers_count)
+        ]
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    def worker_for(self, telegram_id: int) -> Worker:
+        return self.workers[telegram_id % len(self.workers)]
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if request.headers.get(SECRET_HEADER) != _Config.WEBHOOK_SECRET:
+            return web.Response(status=401)
+
+        body = await request.read()
+        try:
+            update = json.loads(body)
+            # Корректный JSON, но не объект ([] или 1) — тоже некорректное обновление
+            if not isinstance(update, dict):
+                raise TypeError("update is not a JSON object")
+            worker = self.worker_for(routing_key(update))
+        except (ValueError, TypeError):
+            return web.Response(status=400)
+
+        return await self._forward(worker, _Config.WEBHOOK_PATH, body, {SECRET_HEADER: _Config.WEBHOOK_SECRET})
+
+    async def handle_payment_notification(self, request: web.Request) -> web.Response:
+        """
+        Уведомление YooKassa уходит воркеру владельца платежа: там живут
+        его кэш квот. IP проверяет сам воркер.
+        """
+        body = await request.read()
+        try:
+            metadata = json.loads(body)["object"].get("metadata") or {}
+            worker = self.worker_for(int(metadata.get("telegram_id", 0)))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return web.Response(status=400)
+
+        return await self._forward(
+            worker,
+            _Config.YUKASSA_WEBHOOK_PATH,
+            body,
+            {"X-Forwarded-For": client_ip(request)}
+        )
+
+    async def _forward(self, worker: Worker, path: str, body: bytes, headers: dict) -> web.Response:
+        # 503 заставит отправителя повторить запрос позже, порядок сохранится
+        if not worker.alive:
+            return web.Response(status=503)
+        try:
+            async with self._session.post(
+                f"{worker.url}{path}",
+                data=body,
+                headers={**headers, "Content-Type": "application/json"}
+            ) as response:
+                return web.Response(
+                    status=response.status,
+                    body=await response.read(),
+                    content_type=response.content_type
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to forward update to worker {worker.index}: {e}")
+            return web.Response(status=503)
+
+    async def _check(self, worker: Worker) -> bool:
+        try:
+            async with self._session.get(f"{worker.url}/healthz") as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_Config.SUPERVISOR_HEALTH_INTERVAL)
+            for worker in self.workers:
+                try:
+                    if not worker.alive:
+                        logger.error(f"Worker {worker.index} exited with code {worker.process.returncode}, restarting")
+                        await worker.start()
+                        continue
+
+                    if await self._check(worker):
+                        worker.failures = 0
+                        continue
+
+                    worker.failures += 1
+                    if worker.failures >= _Config.SUPERVISOR_HEALTH_FAILURES:
+                        logger.error(f"Worker {worker.index} failed {worker.failures} health checks, restarting")
+                        await worker.stop()
+                        await worker.start()
+                except Exception as e:
+                    logger.error(f"Error while supervising worker {worker.index}: {e}")
+
+    async def on_startup(self, app: web.Application) -> None:
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=_Config.SUPERVISOR_FORWARD_TIMEOUT)
+        )
+        for worker in self.workers:
+            await worker.start()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+        bot = Bot(token=_Config.TELEGRAM_BOT_TOKEN)
+        try:
+            await bot.set_webhook(
+                url=f"{_Config.WEBHOOK_BASE_URL.rstrip('/')}{_Config.WEBHOOK_PATH}",
+                secret_token=_Config.WEBHOOK_SECRET
+            )
+        finally:
+            await bot.session.close()
+        logger.info(f"Webhook registered, {len(self.workers)} workers running")
+
+    async def on_shutdown(self, app: web.Application) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+        if self._session:
+            await self._session.close()
+        logger.info("Workers stopped")
+
+
+def main():
+    logging.basicConfig(
+        level=_Config.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    if not _Config.WEBHOOK_SECRET or not _Config.WEBHOOK_BASE_URL:
+        raise ValueError("<Ошибка>: для супервизора нужны WEBHOOK_SECRET и WEBHOOK_BASE_URL!")
+
+    supervisor = Supervisor(max(_Config.SUPERVISOR_WORKERS, 1))
+    app = web.Application()
+    app.router.add_post(_Config.WEBHOOK_PATH, supervisor.handle_update)
+    if _Config.YUKASSA_WEBHOOK_ENABLED:
+        app.router.add_post(_Config.YUKASSA_WEBHOOK_PATH, supervisor.handle_payment_notification)
+    app.on_startup.append(supervisor.on_startup)
+    app.on_shutdown.append(supervisor.on_shutdown)
+    web.run_app(app, host=_Config.WEBHOOK_HOST, port=_Config.WEBHOOK_PORT)
+
+
+if __name__ == '__main__':
+    main()
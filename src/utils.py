@@ -0,0 +1,20 @@
+import logging
+import random
+from typing import Optional
+
+from src.config import _Config
+
+
+def payload_log_level(logger: logging.Logger) -> Optional[int]:
+    """
+    Уровень, с которым стоит логировать полезную нагрузку хода (историю, промпт).
+
+    Returns:
+        DEBUG, если он включён для логгера; INFO для доли ходов
+        AI_DEBUG_SAMPLE_RATE; иначе None — нагрузку не форматируем вовсе
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        return logging.DEBUG
+    if _Config.AI_DEBUG_SAMPLE_RATE > 0 and random.random() < _Config.AI_DEBUG_SAMPLE_RATE:
+        return logging.INFO
+    return None
@@ -0,0 +1,10 @@
+import os
+
+# Config проверяет обязательные переменные при импорте, а context_manager
+# создаёт движок — URL должен разбираться, подключения при этом не будет
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test")
+os.environ.setdefault("DEEPSEEK_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://u:p@localhost/test")
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.setdefault("YUKASSA_SHOP_ID", "test")
+os.environ.setdefault("YUKASSA_SECRET_KEY", "test")
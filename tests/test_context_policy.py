@@ -0,0 +1,60 @@
+from src.ai.context_policy import ContextBudget, TieredContextPolicy, FREE_TIER
+from src.ai.tokenizer import MESSAGE_TOKEN_OVERHEAD
+
+BUDGET = ContextBudget(
+    history_tokens=1024,
+    history_messages=15,
+    fetch_messages=20,
+    max_completion_tokens=2048,
+    block_messages=8
+)
+POLICY = TieredContextPolicy({FREE_TIER: BUDGET})
+
+
+def make_history(count: int, token_count: int = 200):
+    return [
+        {"role": "user", "content": f"message {seq}", "seq": seq, "token_count": token_count}
+        for seq in range(1, count + 1)
+    ]
+
+
+def test_short_history_fits_entirely():
+    history = make_history(3)
+    window, tokens = POLICY.fit(history, BUDGET)
+    assert window == history
+    assert tokens == 3 * (200 + MESSAGE_TOKEN_OVERHEAD)
+
+
+def test_window_starts_on_block_boundary_when_it_fits():
+    # Помещаются 18 сообщений по 55 токенов, начало окна — на границе блока из 8
+    history = make_history(20, token_count=50)
+    window, _ = POLICY.fit(history, BUDGET)
+    assert window[0]["seq"] == 9
+
+
+def test_partly_over_budget_keeps_longest_fitting_tail():
+    # 4 сообщения по 205 токенов помещаются в 1024, 5 — уже нет
+    for count in range(5, 25):
+        history = make_history(count)
+        window, tokens = POLICY.fit(history, BUDGET)
+        assert window[-1] is history[-1]
+        assert tokens <= BUDGET.history_tokens
+        assert len(window) >= 2, f"turn {count}: only {len(window)} message(s) in window"
+
+
+def test_window_start_moves_in_blocks():
+    starts = [POLICY.fit(make_history(count, token_count=50), BUDGET)[0][0]["seq"] for count in range(19, 40)]
+    assert all((seq - 1) % BUDGET.block_messages == 0 for seq in starts)
+
+
+def test_window_respects_summary_seq():
+    history = make_history(23, token_count=50)[3:]
+    window, _ = POLICY.fit(history, BUDGET, summary_seq=3)
+    assert window[0]["seq"] == 12
+
+
+def test_oversized_last_message_is_kept():
+    history = make_history(3)
+    history[-1]["token_count"] = 5000
+    window, _ = POLICY.fit(history, BUDGET)
+    assert window == history[-1:]
@@ -0,0 +1,29 @@
+import time
+
+from src.database.CRUDs.quota_cache import QuotaCache, QuotaState
+
+
+def test_update_does_not_extend_ttl():
+    cache = QuotaCache(ttl=0.2)
+    cache.set(1, QuotaState(daily_token_limit=50000, tokens_used_today=0))
+
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        cache.update(1, tokens_used_today=100, daily_token_limit=49999)
+        time.sleep(0.05)
+
+    assert cache.get(1) is None
+
+
+def test_update_replaces_state():
+    cache = QuotaCache(ttl=60)
+    cache.set(1, QuotaState(daily_token_limit=50000, tokens_used_today=0, subscription_type="premium"))
+    cache.update(1, tokens_used_today=100)
+
+    assert cache.get(1) == QuotaState(daily_token_limit=50000, tokens_used_today=100, subscription_type="premium")
+
+
+def test_update_ignores_missing_user():
+    cache = QuotaCache(ttl=60)
+    cache.update(1, tokens_used_today=100)
+    assert cache.get(1) is None
@@ -0,0 +1,24 @@
+from src.ai.response_cache import CachedResponse
+from src.ai.semantic_cache import HashedNgramEmbedder, SemanticCache
+
+
+def make_cache() -> SemanticCache:
+    return SemanticCache(HashedNgramEmbedder(dim=1024), capacity=16, threshold=0.95, ttl=60)
+
+
+def test_paraphrase_hits():
+    cache = make_cache()
+    cache.set("Сколько дней в феврале 2024 года?", CachedResponse("29", 1))
+    assert cache.get("сколько дней в феврале 2024 года") == CachedResponse("29", 1)
+
+
+def test_different_numbers_miss():
+    cache = make_cache()
+    cache.set("Сколько дней в феврале 2024 года?", CachedResponse("29", 1))
+    assert cache.get("Сколько дней в феврале 2023 года?") is None
+
+
+def test_unrelated_question_misses():
+    cache = make_cache()
+    cache.set("Как приготовить борщ?", CachedResponse("...", 1))
+    assert cache.get("Как починить велосипед?") is None